@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db import connection
 
-from .models import Group, Post, Comment, Follow
+from . import search
+from .models import Group, Post, Comment, Follow, PostSearch
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +11,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date", "group")
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # на SQLite ищем по индексу FTS5, а не LIKE '%...%' по всей таблице
+        query = search.build_query(search_term)
+        if query and connection.vendor == 'sqlite':
+            found = PostSearch.objects.filter(text__match=query)
+            return queryset.filter(id__in=found.values('post_id')), False
+        return super().get_search_results(request, queryset, search_term)
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
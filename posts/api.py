@@ -0,0 +1,147 @@
+"""JSON-версия лент для мобильных клиентов.
+
+Те же querysets и курсоры, что и у HTML-страниц. ETag и Last-Modified
+берутся из меток posts/versions.py, поэтому неизменившаяся лента
+отвечает 304 ещё до запросов к постам и сериализации.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from . import feed, versions
+from .models import Group, Post, User
+from .paginator import CursorPaginator
+
+# компактный JSON: без пробелов, кириллица без \u-экранирования
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def post_data(post):
+    return {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def page_data(page, serialize):
+    return {
+        'results': [serialize(item) for item in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def _json(data):
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+
+
+def _page(request, queryset, per_page, **options):
+    paginator = CursorPaginator(queryset, per_page, **options)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@require_safe
+@versions.condition_on(lambda request: ['posts'])
+def index(request):
+    page = _page(
+        request, Post.objects.for_feed(), settings.PAGINATOR_PAGE_SIZE
+    )
+    return _json(page_data(page, post_data))
+
+
+def _group_scopes(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    request.api_group = group
+    return [f'group:{group.pk}']
+
+
+@require_safe
+@versions.condition_on(_group_scopes)
+def group_posts(request, slug):
+    page = _page(
+        request, request.api_group.posts.for_feed(),
+        settings.PAGINATOR_PAGE_SIZE,
+    )
+    return _json(page_data(page, post_data))
+
+
+def _author_scopes(request, username):
+    author = get_object_or_404(User, username=username)
+    request.api_author = author
+    return [f'author:{author.pk}']
+
+
+@require_safe
+@versions.condition_on(_author_scopes)
+def profile(request, username):
+    page = _page(
+        request, request.api_author.posts.for_feed(),
+        settings.PAGINATOR_PAGE_SIZE,
+    )
+    return _json(page_data(page, post_data))
+
+
+def _post_scopes(request, username, post_id):
+    return [f'post:{post_id}']
+
+
+@require_safe
+@versions.condition_on(_post_scopes)
+def post_view(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.for_feed(), author__username=username, id=post_id
+    )
+    comments = _page(
+        request, post.comments.select_related('author'),
+        settings.COMMENTS_PAGE_SIZE, ordering=('created', 'id'),
+    )
+    return _json({
+        'post': post_data(post),
+        'comments': page_data(comments, comment_data),
+    })
+
+
+def _authenticated(view):
+    # для API вместо редиректа на форму входа — 401
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется авторизация'}, status=401,
+                json_dumps_params=JSON_PARAMS,
+            )
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def _follow_scopes(request):
+    return ['posts', f'follow:{request.user.pk}']
+
+
+@require_safe
+@_authenticated
+@versions.condition_on(_follow_scopes)
+def follow_index(request):
+    entries, ordering, transform = feed.feed_paginator_args(request.user)
+    page = _page(
+        request, entries, settings.PAGINATOR_PAGE_SIZE,
+        ordering=ordering, transform=transform,
+    )
+    return _json(page_data(page, post_data))
@@ -0,0 +1,55 @@
+"""Массовая запись в обход сигналов: seed_data и import_content.
+
+bulk_create не вызывает ни save(), ни сигналы, поэтому счётчики,
+ленты и кэши после него приводятся в порядок целиком, один раз.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+
+@contextmanager
+def explicit_dates(*fields):
+    # auto_now_add перезаписывает даты и в bulk_create, а нам нужны
+    # даты из источника
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def bulk_insert(model, objs):
+    """bulk_create, после которого у объектов есть pk.
+
+    PostgreSQL возвращает ключи сам. На SQLite Django 2.2 их не
+    возвращает, и они дочитываются следующим запросом: новые строки —
+    это строки с ключом больше прежнего максимума. Так верно, пока
+    пишет только вызывающий, то есть внутри atomic() (BEGIN IMMEDIATE,
+    yatube/db/sqlite).
+    """
+    last = model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+    # batch_size подбирает Django по пределу параметров СУБД
+    model.objects.bulk_create(objs)
+    if objs and objs[0].pk is None:
+        pks = model.objects.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True
+        )
+        for obj, pk in zip(objs, pks):
+            obj.pk = pk
+    return objs
+
+
+def chunked(iterable, size):
+    """Списки по size элементов: IN (...) не упирается в предел
+    параметров запроса."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
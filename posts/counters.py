@@ -0,0 +1,67 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Profile
+
+from .models import Comment, Follow, Post, User
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def change_profile(user_id, **deltas):
+    """change_profile(user.id, posts_count=1) — атомарно через F()."""
+    Profile.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def _count_of(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def recount(user_ids=None):
+    """Пересчитывает все счётчики по исходным таблицам.
+
+    Возвращает количество исправленных профилей и постов.
+    """
+    # пользователи, созданные в обход сигналов (bulk_create), без профиля
+    missing = User.objects.filter(profile__isnull=True)
+    if user_ids is not None:
+        missing = missing.filter(id__in=user_ids)
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id)
+        for user_id in missing.values_list('id', flat=True)
+    )
+    profiles = Profile.objects.all()
+    posts = Post.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+        posts = posts.filter(author_id__in=user_ids)
+    profiles = profiles.annotate(
+        real_posts=_count_of(Post, 'author', 'user_id'),
+        real_followers=_count_of(Follow, 'author', 'user_id'),
+        real_following=_count_of(Follow, 'user', 'user_id'),
+    )
+    fixed_profiles = profiles.exclude(
+        posts_count=F('real_posts'),
+        followers_count=F('real_followers'),
+        following_count=F('real_following'),
+    ).update(
+        posts_count=_count_of(Post, 'author', 'user_id'),
+        followers_count=_count_of(Follow, 'author', 'user_id'),
+        following_count=_count_of(Follow, 'user', 'user_id'),
+    )
+    posts = posts.annotate(real_comments=_count_of(Comment, 'post'))
+    fixed_posts = posts.exclude(comments_count=F('real_comments')).update(
+        comments_count=_count_of(Comment, 'post')
+    )
+    return fixed_profiles, fixed_posts
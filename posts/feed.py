@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from users.models import Profile
+
+from .models import FeedEntry, Follow, Post
+
+
+def is_pull_author(author_id):
+    """Лента автора собирается при чтении, а не рассылкой."""
+    return Profile.objects.filter(
+        user_id=author_id, feed_pull=True
+    ).exists()
+
+
+def get_pull_authors():
+    """Авторы, чьи посты не раскладываются по лентам.
+
+    Режим хранится в Profile.feed_pull, а не в кэше: его видят все
+    процессы, и он не теряется вместе с кэшем.
+    """
+    return set(Profile.objects.filter(feed_pull=True).values_list(
+        'user_id', flat=True
+    ))
+
+
+def _insert(select, params):
+    """INSERT INTO posts_feedentry ... SELECT одним запросом.
+
+    У SELECT должен быть WHERE: иначе SQLite принимает ON CONFLICT
+    за часть JOIN.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) {select} '
+            f'ON CONFLICT DO NOTHING',
+            params,
+        )
+
+
+# последние FEED_BACKFILL_LIMIT постов автора f.author_id — по индексу
+# post_author_date_idx, сколько бы постов у него ни было
+_LATEST_POSTS = f"""
+    SELECT f.user_id, p.id, p.pub_date
+    FROM {Follow._meta.db_table} f
+    JOIN {Post._meta.db_table} p ON p.id IN (
+        SELECT id FROM {Post._meta.db_table}
+        WHERE author_id = f.author_id
+        ORDER BY pub_date DESC, id DESC LIMIT %s
+    )
+"""
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    _insert(
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'WHERE p.id = %s',
+        [post.pk],
+    )
+
+
+def add_author(user_id, author_id):
+    """Подписка: переносит в ленту последние посты автора."""
+    # переключение — условный UPDATE в базе: одновременные подписки
+    # из разных процессов не перезаписывают режим друг другу
+    Profile.objects.filter(
+        user_id=author_id, feed_pull=False,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).update(feed_pull=True)
+    if is_pull_author(author_id):
+        return
+    _insert(
+        _LATEST_POSTS + 'WHERE f.user_id = %s AND f.author_id = %s',
+        [settings.FEED_BACKFILL_LIMIT, user_id, author_id],
+    )
+
+
+def remove_author(user_id, author_id):
+    """Отписка: убирает посты автора из ленты.
+
+    Автор, у которого подписчиков стало мало, остаётся в режиме
+    чтения: вернуть его в рассылку — дело backfill_feeds --resume,
+    а не чужого запроса на отписку.
+    """
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def resume_push_authors():
+    """Возвращает в рассылку авторов, у которых подписчиков меньше
+    FEED_FANOUT_RESUME_FOLLOWERS, и догоняет ленты их подписчиков.
+
+    Между порогами FEED_FANOUT_RESUME_FOLLOWERS
+    и FEED_FANOUT_MAX_FOLLOWERS автор остаётся в прежнем режиме,
+    поэтому подписки и отписки у порога не переключают его туда
+    и обратно.
+    """
+    resumed = list(Profile.objects.filter(
+        feed_pull=True,
+        followers_count__lt=settings.FEED_FANOUT_RESUME_FOLLOWERS,
+    ).values_list('user_id', flat=True))
+    for author_id in resumed:
+        # сначала переключаем: новые посты уже разойдутся по лентам,
+        # а догонка пропустит те, что успели попасть туда сами
+        Profile.objects.filter(user_id=author_id).update(feed_pull=False)
+        _insert(
+            _LATEST_POSTS + 'WHERE f.author_id = %s',
+            [settings.FEED_BACKFILL_LIMIT, author_id],
+        )
+    return resumed
+
+
+def rebuild_feeds(user_ids):
+    """Пересобирает ленты пользователей с нуля (backfill_feeds)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    FeedEntry.objects.filter(user_id__in=user_ids).delete()
+    where = 'WHERE f.user_id IN (%s)' % ', '.join(['%s'] * len(user_ids))
+    where += (
+        f' AND f.author_id NOT IN (SELECT user_id '
+        f'FROM {Profile._meta.db_table} WHERE feed_pull)'
+    )
+    _insert(
+        _LATEST_POSTS + where, [settings.FEED_BACKFILL_LIMIT, *user_ids]
+    )
+
+
+def rebuild_feed(user_id):
+    rebuild_feeds([user_id])
+
+
+def feed_paginator_args(user):
+    """Queryset, сортировка и transform для CursorPaginator.
+
+    Если пользователь не подписан на «тяжёлых» авторов, лента читается
+    только из FeedEntry; иначе к ней добавляются посты таких авторов.
+    """
+    pulled = list(Follow.objects.filter(
+        user=user, author__profile__feed_pull=True
+    ).values_list('author_id', flat=True))
+    if not pulled:
+        entries = FeedEntry.objects.filter(user=user).select_related(
+            'post', 'post__author', 'post__group'
+        )
+        return entries, ('-pub_date', '-post_id'), _entries_to_posts
+    posts = Post.objects.for_feed().filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    )
+    return posts, ('-pub_date', '-id'), None
+
+
+def _entries_to_posts(entries):
+    return [entry.post for entry in entries]
@@ -0,0 +1,69 @@
+"""На кого подписан пользователь: множества id авторов в памяти.
+
+Проверка «подписан ли я на X» (кнопка в карточке автора) не идёт
+в базу: множество грузится одним запросом при первом обращении
+и живёт в LRU процесса на FOLLOW_CACHE_USERS пользователей. Свежесть
+сверяется с меткой versions 'follow:<id>', которую сигналы подписки
+сдвигают для всех процессов; подписка и отписка в этом процессе
+после COMMIT правят множество на месте.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import versions
+from .models import Follow
+
+
+class FollowingCache:
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(user_id):
+        return versions.last_modified(f'follow:{user_id}')
+
+    def _store(self, user_id, stamp, authors):
+        with self._lock:
+            self._entries[user_id] = (stamp, authors)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def authors(self, user_id):
+        """frozenset id авторов, на которых подписан user_id."""
+        stamp = self._stamp(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+        authors = frozenset(Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        self._store(user_id, stamp, authors)
+        return authors
+
+    def is_following(self, user, author_id):
+        return user.is_authenticated and author_id in self.authors(user.pk)
+
+    def changed(self, user_id, author_id, following):
+        """Подписка или отписка: вызывается после сдвига метки."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        authors = entry[1] | {author_id} if following else (
+            entry[1] - {author_id}
+        )
+        self._store(user_id, self._stamp(user_id), authors)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+following = FollowingCache(settings.FOLLOW_CACHE_USERS)
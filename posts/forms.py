@@ -1,10 +1,40 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import thumbnails, uploads
 from .models import Comment, Post
 
 
 class PostForm(forms.ModelForm):
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # уже сохранённую картинку (правка поста) не трогаем
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return uploads.normalize_upload(image)
+        except uploads.ImageRejected as error:
+            raise forms.ValidationError(str(error))
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            # варианты старой картинки больше не подходят
+            self.instance.image_variants = ''
+        post = super().save(commit=commit)
+        if 'image' in self.changed_data and post.image:
+            # миниатюры режет thumbnail_worker, а не первый запрос страницы
+            if commit:
+                thumbnails.enqueue_presets(post.image.name)
+            else:
+                save_m2m = self.save_m2m
+
+                def save_and_enqueue():
+                    save_m2m()
+                    thumbnails.enqueue_presets(post.image.name)
+                self.save_m2m = save_and_enqueue
+        return post
+
     class Meta:
         model = Post
         fields = ("text", "group", "image")
@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import F
+
+from .models import Post
+
+# имя фрагмента из {% cache ... post_item post.pk post.version %}
+# в includes/post_item.html
+FRAGMENT_NAME = 'post_item'
+
+
+def fragment_key(post_id, version):
+    return make_template_fragment_key(FRAGMENT_NAME, [post_id, version])
+
+
+def invalidate(post_id, version=None):
+    """Сдвигает версию поста и удаляет его старый фрагмент.
+
+    Шаблон строит ключ из версии, поэтому после сдвига фрагмент
+    будет отрисован заново даже если delete не дошёл до кэша.
+    """
+    if version is None:
+        version = Post.objects.filter(pk=post_id).values_list(
+            'version', flat=True
+        ).first()
+    Post.objects.filter(pk=post_id).update(version=F('version') + 1)
+    if version is not None:
+        cache.delete(fragment_key(post_id, version))
+
+
+def invalidate_group(group_id):
+    # название и slug группы входят во фрагмент каждого её поста
+    Post.objects.filter(group_id=group_id).update(version=F('version') + 1)
+
+
+def forget(post):
+    cache.delete(fragment_key(post.pk, post.version))
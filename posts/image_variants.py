@@ -0,0 +1,136 @@
+"""Адаптивные варианты картинки поста: несколько ширин и форматов.
+
+Варианты режет thumbnail_worker (задача с geometry=VARIANTS_JOB), а их
+описание сохраняется в Post.image_variants, поэтому шаблону для
+<picture>/srcset не нужны ни stat файлов, ни key-value хранилище sorl.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post
+
+# особая «геометрия» в очереди ThumbnailJob
+VARIANTS_JOB = 'variants'
+
+# формат Pillow, расширение и MIME-тип; порядок — от лучшего сжатия
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+def supported_formats():
+    """Форматы из настроек, которые умеет кодировать установленный Pillow."""
+    Image.init()
+    return [
+        name for name in settings.POST_IMAGE_FORMATS
+        if name in FORMATS and FORMATS[name][0] in Image.SAVE
+    ]
+
+
+def _crop_to_aspect(image):
+    # как crop="center" у прежней миниатюры 960x339
+    target_width, target_height = settings.POST_IMAGE_ASPECT
+    if image.width * target_height > image.height * target_width:
+        size = (round(image.height * target_width / target_height),
+                image.height)
+    else:
+        size = (image.width,
+                round(image.width * target_height / target_width))
+    return ImageOps.fit(image, size, method=Image.LANCZOS)
+
+
+def build_variants(post):
+    """Режет варианты картинки поста и возвращает их описание."""
+    with post.image.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    image = _crop_to_aspect(image)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    widths = sorted(
+        {min(width, image.width) for width in settings.POST_IMAGE_WIDTHS}
+    )
+    variants = {}
+    for name in supported_formats():
+        pillow_format, extension, _ = FORMATS[name]
+        variants[name] = []
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(
+                buffer, pillow_format,
+                quality=settings.POST_IMAGE_QUALITY, optimize=True,
+            )
+            path = default_storage.save(
+                f'posts/variants/{post.pk}/{stem}_{width}.{extension}',
+                ContentFile(buffer.getvalue()),
+            )
+            variants[name].append([width, height, path])
+    return {'width': image.width, 'height': image.height,
+            'formats': variants}
+
+
+def variant_paths(raw):
+    """Пути файлов, перечисленных в JSON Post.image_variants."""
+    if not raw:
+        return set()
+    return {
+        path for items in json.loads(raw).get('formats', {}).values()
+        for width, height, path in items
+    }
+
+
+def delete_files(*paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+def store_variants(image_name):
+    """Задача воркера: варианты для всех постов с этой картинкой."""
+    for post in Post.objects.filter(image=image_name):
+        meta = json.dumps(build_variants(post))
+        stored = Post.objects.filter(pk=post.pk, image=image_name).update(
+            image_variants=meta
+        )
+        new = variant_paths(meta)
+        if stored:
+            # повторная нарезка: прежние файлы больше никто не покажет
+            delete_files(*variant_paths(post.image_variants) - new)
+        else:
+            # картинку успели сменить или пост удалили
+            delete_files(*new)
+
+
+def picture_context(post):
+    """Контекст для includes/picture.html из Post.image_variants."""
+    meta = post.variants
+    if not meta or not meta.get('formats'):
+        return None
+    sources = []
+    fallback = None
+    for name, items in meta['formats'].items():
+        srcset = ', '.join(
+            f'{default_storage.url(path)} {width}w'
+            for width, height, path in items
+        )
+        sources.append({'type': FORMATS[name][2], 'srcset': srcset})
+        fallback = items
+    # последний формат в списке самый совместимый — им же заполняем <img>
+    sources.pop()
+    width, height, path = fallback[-1]
+    return {
+        'sources': sources,
+        'srcset': srcset,
+        'src': default_storage.url(path),
+        'width': width,
+        'height': height,
+        'sizes': settings.POST_IMAGE_SIZES,
+    }
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.bulk import chunked
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает готовые ленты подписок (таблица FeedEntry)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='только эти пользователи (по умолчанию все)'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help=('только вернуть в рассылку авторов, у которых '
+                  'подписчиков меньше FEED_FANOUT_RESUME_FOLLOWERS, '
+                  'и догнать ленты их подписчиков (для cron)')
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            resumed = feed.resume_push_authors()
+            self.stdout.write(self.style.SUCCESS(
+                f'Возвращено в рассылку авторов: {len(resumed)}'
+            ))
+            return
+        pull_authors = feed.get_pull_authors()
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        total = 0
+        for user_ids in chunked(users.values_list('id', flat=True).iterator(),
+                                settings.FEED_BATCH_SIZE):
+            feed.rebuild_feeds(user_ids)
+            total += len(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент пересобрано: {total}, '
+            f'авторов в режиме чтения: {len(pull_authors)}'
+        ))
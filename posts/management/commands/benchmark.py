@@ -0,0 +1,218 @@
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks',
+                                'baseline.json')
+# адреса, которые пишут в базу: их прогон откатывается
+WRITE_ROUTES = ('profile_follow', 'profile_unfollow')
+
+
+def percentile(values, share):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(math.ceil(share * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def routes():
+    """(метка, клиент, адрес) для каждого адреса posts/urls.py.
+
+    Данные берутся самые тяжёлые: читатель с наибольшим числом
+    подписок, автор с наибольшим числом подписчиков, самая большая
+    группа и самый обсуждаемый пост.
+    """
+    empty = CommandError('Нужны данные: сначала выполните seed_data')
+    reader = User.objects.order_by('-profile__following_count').first()
+    if reader is None:
+        raise empty
+    star = User.objects.exclude(pk=reader.pk).order_by(
+        '-profile__followers_count'
+    ).first()
+    post = Post.objects.select_related('author').order_by(
+        '-comments_count', '-id'
+    ).first()
+    if star is None or post is None:
+        raise empty
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    anonymous = Client()
+    reader_client = Client()
+    reader_client.force_login(reader)
+    author_client = Client()
+    author_client.force_login(post.author)
+    post_args = [post.author.username, post.pk]
+    public = [
+        ('index', reverse('index')),
+        ('profile', reverse('profile', args=[star.username])),
+        ('post', reverse('post', args=post_args)),
+        ('search', reverse('search') + '?q=кофе'),
+        ('trending', reverse('trending')),
+    ]
+    if group is not None:
+        public.append(
+            ('group_posts', reverse('group_posts', args=[group.slug]))
+        )
+    result = []
+    for name, url in public:
+        result.append((f'{name} (гость)', anonymous, url))
+        result.append((name, reader_client, url))
+    result += [
+        ('follow_index', reader_client, reverse('follow_index')),
+        ('followers', reader_client,
+         reverse('followers', args=[star.username])),
+        ('following', reader_client,
+         reverse('following', args=[reader.username])),
+        ('new_post', reader_client, reverse('new_post')),
+        ('post_edit', author_client, reverse('post_edit', args=post_args)),
+        # GET без формы только перенаправляет на пост
+        ('add_comment', reader_client,
+         reverse('add_comment', args=post_args)),
+        # пишут в базу: каждый прогон откатывается (WRITE_ROUTES),
+        # и следующий запуск меряет тот же граф подписок
+        ('profile_follow', reader_client,
+         reverse('profile_follow', args=[star.username])),
+        ('profile_unfollow', reader_client,
+         reverse('profile_unfollow', args=[star.username])),
+        ('404', anonymous, reverse('404')),
+        ('500', anonymous, reverse('500')),
+    ]
+    return result
+
+
+@contextmanager
+def rolled_back():
+    """Всё, что записано в блоке, откатывается; колбэки on_commit
+    (сброс кэшей) не выполняются."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(client, url, requests, warmup):
+    for _ in range(warmup):
+        client.get(url)
+    timings, queries = [], []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    return {
+        'p50': round(percentile(timings, 0.50), 2),
+        'p95': round(percentile(timings, 0.95), 2),
+        'p99': round(percentile(timings, 0.99), 2),
+        'queries': max(queries),
+    }
+
+
+def regressions(results, baseline, tolerance, min_delta):
+    """Отличия от базовой линии, которые считаются регрессией."""
+    found = []
+    for label, current in results.items():
+        base = baseline.get(label)
+        if base is None:
+            continue
+        if current['queries'] > base['queries']:
+            found.append(
+                f'{label}: запросов {current["queries"]} '
+                f'вместо {base["queries"]}'
+            )
+        limit = max(base['p95'] * (1 + tolerance), base['p95'] + min_delta)
+        if current['p95'] > limit:
+            found.append(
+                f'{label}: p95 {current["p95"]} мс вместо {base["p95"]} мс'
+            )
+    return found
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все адреса posts/urls.py через тестовый клиент, '
+            'печатает p50/p95/p99 и число запросов и сравнивает '
+            'их с сохранённой базовой линией')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--baseline', default=DEFAULT_BASELINE,
+            help=('файл базовой линии; сохранённая в репозитории снята на '
+                  'seed_data --users 500 --posts 10000 --comments 20000 '
+                  '--follows 10')
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='записать результаты как новую базовую линию'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='допустимый рост p95 (доля, по умолчанию 50%%)'
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=2.0,
+            help='рост p95 меньше стольких мс не считается регрессией'
+        )
+        parser.add_argument(
+            '--only', nargs='*',
+            help='прогнать только эти метки'
+        )
+
+    def handle(self, *args, **options):
+        # 404 и 500 из прогона не должны засыпать вывод предупреждениями
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        results = {}
+        self.stdout.write(
+            f'{"адрес":<22}{"p50":>9}{"p95":>9}{"p99":>9}{"SQL":>6}'
+        )
+        for label, client, url in routes():
+            if options['only'] and label not in options['only']:
+                continue
+            cache.clear()
+            writes = rolled_back() if label in WRITE_ROUTES else nullcontext()
+            with writes:
+                results[label] = stats = measure(
+                    client, url, options['requests'], options['warmup']
+                )
+            self.stdout.write(
+                f'{label:<22}{stats["p50"]:>9}{stats["p95"]:>9}'
+                f'{stats["p99"]:>9}{stats["queries"]:>6}'
+            )
+        path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2,
+                          ensure_ascii=False, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {path}'
+            ))
+            return
+        if not os.path.exists(path):
+            self.stdout.write(
+                f'Базовой линии {path} нет, сравнивать не с чем'
+            )
+            return
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        found = regressions(
+            results, baseline, options['tolerance'], options['min_delta']
+        )
+        if found:
+            raise CommandError('Регрессии:\n' + '\n'.join(found))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
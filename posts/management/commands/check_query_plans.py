@@ -0,0 +1,108 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts import feed
+from posts.models import (Comment, FeedEntry, Follow, Group, Post,
+                          TrendingGroup, TrendingPost, User)
+from posts.paginator import NEXT, PREVIOUS, CursorPaginator
+
+# признаки плана, при которых запрос читает таблицу целиком
+# или сортирует выборку вместо чтения в порядке индекса
+BAD_PLAN = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?\S+$|TEMP B-TREE', re.M),
+    'postgresql': re.compile(r'Seq Scan|\bSort\b'),
+    'mysql': re.compile(r'\bALL\b|Using filesort'),
+}
+
+
+def _pages(name, queryset, sample, ordering=('-pub_date', '-id')):
+    """Первая страница и переходы по курсору вперёд и назад."""
+    paginator = CursorPaginator(queryset, 10, ordering=ordering)
+    yield f'{name}: первая страница', paginator.seek()[0][:11]
+    for direction in (NEXT, PREVIOUS):
+        cursor = paginator.encode_cursor(direction, sample)
+        yield f'{name}: курсор {direction}', paginator.seek(cursor)[0][:11]
+
+
+def view_queries():
+    """Запросы, которые выполняют view из posts/views.py."""
+    user = User.objects.first() or User(pk=1)
+    group = Group.objects.first() or Group(pk=1)
+    post = Post.objects.first() or Post(pk=1, author=user)
+    sample = Post(pk=post.pk, pub_date=post.pub_date or timezone.now())
+
+    yield from _pages('index', Post.objects.for_feed(), sample)
+    yield from _pages(
+        'group_posts', Post.objects.for_feed().filter(group=group), sample
+    )
+    yield from _pages(
+        'profile', Post.objects.for_feed().filter(author=user), sample
+    )
+    entries, ordering, _ = feed.feed_paginator_args(user)
+    yield from _pages(
+        'follow_index', entries,
+        FeedEntry(post_id=sample.pk, pub_date=sample.pub_date)
+        if entries.model is FeedEntry else sample,
+        ordering=ordering,
+    )
+    for side in ('author', 'user'):
+        yield from _pages(
+            f'follow_list: по {side}', Follow.objects.filter(**{side: user}),
+            Follow(pk=1), ordering=('-id',),
+        )
+    yield 'follow_cache: подписки читателя', Follow.objects.filter(
+        user=user
+    ).values_list('author_id', flat=True)
+    yield 'profile: подписчики', Follow.objects.filter(author=user)
+    yield 'trending: топ постов', TrendingPost.objects.order_by(
+        '-score'
+    ).values_list('post_id', flat=True)[:30]
+    yield 'trending: топ групп', TrendingGroup.objects.order_by(
+        '-score'
+    ).values_list('group_id', flat=True)[:10]
+    # get_object_or_404 сбрасывает сортировку, как и QuerySet.get()
+    yield 'post_view: пост', Post.objects.for_feed().filter(
+        author__username=user.username, id=post.pk
+    ).order_by()
+    comments = Comment.objects.filter(post=post)
+    yield from _pages(
+        'post_view: комментарии', comments,
+        Comment(pk=1, created=sample.pub_date), ordering=('created', 'id'),
+    )
+    yield 'feed: авторы в режиме чтения', Follow.objects.filter(
+        user=user, author__profile__feed_pull=True
+    )
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов лент и падает, '
+            'если какой-то из них читает таблицу целиком')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='печатать планы всех запросов'
+        )
+
+    def handle(self, *args, **options):
+        bad_plan = BAD_PLAN.get(connection.vendor)
+        if bad_plan is None:
+            raise CommandError(
+                f'Нет правил разбора плана для {connection.vendor}'
+            )
+        failed = []
+        for name, queryset in view_queries():
+            plan = queryset.explain()
+            bad = bad_plan.search(plan)
+            if bad or options['verbose_plans']:
+                self.stdout.write(f'{name}:\n{plan}\n')
+            if bad:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Полный просмотр таблицы или сортировка: ' + ', '.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('Все запросы идут по индексам'))
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Comment, Follow, Group, Post
+
+# порядок важен: import_content читает файл одним проходом, и группы
+# с постами должны встретиться раньше, чем ссылки на них
+EXPORTS = (
+    ('posts.group', Group.objects.order_by('id'),
+     {'slug': 'slug', 'title': 'title', 'description': 'description'}),
+    ('posts.post', Post.objects.order_by('id'),
+     {'id': 'id', 'author': 'author__username', 'group': 'group__slug',
+      'text': 'text', 'pub_date': 'pub_date', 'image': 'image'}),
+    ('posts.comment', Comment.objects.order_by('id'),
+     {'post': 'post_id', 'author': 'author__username', 'text': 'text',
+      'created': 'created'}),
+    ('posts.follow', Follow.objects.order_by('id'),
+     {'user': 'user__username', 'author': 'author__username'}),
+)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL: '
+            'по строке на объект, память не растёт с размером базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='файл (по умолчанию стандартный вывод)'
+        )
+        parser.add_argument(
+            '--chunk', type=int, default=2000,
+            help='строк за одно чтение курсора'
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self.export(self.stdout.write, options['chunk'])
+            return
+        with open(options['path'], 'w', encoding='utf-8') as out:
+            counts = self.export(
+                lambda line: out.write(line + '\n'), options['chunk']
+            )
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{label}: {count}' for label, count in counts.items()
+        )))
+
+    def export(self, write, chunk):
+        counts = {}
+        for label, queryset, fields in EXPORTS:
+            counts[label] = 0
+            # values() без экземпляров моделей; iterator() читает
+            # порциями (на PostgreSQL — серверным курсором)
+            rows = queryset.values_list(*fields.values()).iterator(
+                chunk_size=chunk
+            )
+            for row in rows:
+                record = {'model': label, **dict(zip(fields, row))}
+                write(json.dumps(
+                    record, ensure_ascii=False, separators=(',', ':'),
+                    cls=DjangoJSONEncoder,
+                ))
+                counts[label] += 1
+        return counts
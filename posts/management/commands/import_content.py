@@ -0,0 +1,212 @@
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from posts import feed
+from posts.bulk import bulk_insert, chunked, explicit_dates
+from posts.counters import recount
+from posts.models import Comment, Follow, Group, Post, User
+
+
+# пользователей в одном IN (...): recount и выборка подписчиков
+# не должны упираться в предел параметров SQLite (999 на старых сборках)
+CHUNK = 500
+
+
+def batches(lines, size):
+    """(модель, список записей) подряд идущих строк одной модели.
+
+    Номер строки файла сохраняется в записи под ключом '_line'.
+    """
+    records = (
+        dict(json.loads(line), _line=number)
+        for number, line in enumerate(lines, 1) if line.strip()
+    )
+    for label, group in groupby(records, key=lambda record: record['model']):
+        while True:
+            batch = list(islice(group, size))
+            if not batch:
+                break
+            yield label, batch
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSONL из export_content: bulk_create порциями, '
+            'авторы и группы — по словарям имён, счётчики, ленты '
+            'и кэши — один раз в конце')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='файл (по умолчанию стандартный ввод)'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=5000,
+            help='записей в одном bulk_create'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='создать недостающих пользователей без пароля'
+        )
+        parser.add_argument(
+            '--skip-feeds', action='store_true',
+            help=('не пересобирать ленты подписчиков (на больших '
+                  'выгрузках это дольше самой загрузки); потом '
+                  'выполнить backfill_feeds')
+        )
+
+    def handle(self, *args, **options):
+        self.create_users = options['create_users']
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        # id поста в источнике -> id здесь; посты в выгрузке идут по
+        # возрастанию id, поэтому хватает двух массивов и бинарного поиска
+        self.old_post_ids = array('q')
+        self.new_post_ids = array('q')
+        self.touched = set()
+        self.counts = dict.fromkeys(
+            ('posts.group', 'posts.post', 'posts.comment', 'posts.follow'), 0
+        )
+        if options['path'] == '-':
+            self.load(sys.stdin, options['batch'])
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                self.load(source, options['batch'])
+        cache.clear()
+        if not options['skip_feeds']:
+            self.rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{label}: {count}' for label, count in self.counts.items()
+        )))
+
+    def load(self, lines, size):
+        handlers = {
+            'posts.group': self.import_groups,
+            'posts.post': self.import_posts,
+            'posts.comment': self.import_comments,
+            'posts.follow': self.import_follows,
+        }
+        with transaction.atomic(), explicit_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created')):
+            for label, batch in batches(lines, size):
+                if label not in handlers:
+                    raise CommandError(f'Неизвестная модель {label}')
+                handlers[label](batch)
+                self.counts[label] += len(batch)
+            # bulk_create обходит сигналы: счётчики пересчитываются
+            # только у затронутых пользователей и их постов
+            for user_ids in chunked(sorted(self.touched), CHUNK):
+                recount(user_ids)
+
+    @transaction.atomic
+    def rebuild_feeds(self):
+        followers = set()
+        for user_ids in chunked(sorted(self.touched), CHUNK):
+            followers.update(Follow.objects.filter(
+                Q(author_id__in=user_ids) | Q(user_id__in=user_ids)
+            ).values_list('user_id', flat=True))
+        for user_ids in chunked(sorted(followers),
+                                settings.FEED_BATCH_SIZE):
+            feed.rebuild_feeds(user_ids)
+
+    def user_ids(self, usernames):
+        missing = {name for name in usernames if name not in self.users}
+        if missing and not self.create_users:
+            raise CommandError(
+                'Нет пользователей: ' + ', '.join(sorted(missing)[:10])
+                + ' (создать их: --create-users)'
+            )
+        if missing:
+            # вход только после сброса пароля
+            password = make_password(None)
+            User.objects.bulk_create(
+                User(username=name, password=password) for name in missing
+            )
+            self.users.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'id'))
+        ids = [self.users[name] for name in usernames]
+        self.touched.update(ids)
+        return ids
+
+    def post_id(self, old_id):
+        position = bisect_left(self.old_post_ids, old_id)
+        if (position == len(self.old_post_ids)
+                or self.old_post_ids[position] != old_id):
+            raise CommandError(f'Комментарий к посту {old_id} до поста')
+        return self.new_post_ids[position]
+
+    def group_id(self, record):
+        slug = record['group']
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise CommandError(
+                f'Строка {record["_line"]}: нет группы {slug}'
+            )
+        return self.groups[slug]
+
+    def import_groups(self, batch):
+        new = [record for record in batch
+               if record['slug'] not in self.groups]
+        Group.objects.bulk_create(
+            Group(slug=record['slug'], title=record['title'],
+                  description=record['description'])
+            for record in new
+        )
+        self.groups.update(Group.objects.filter(
+            slug__in=[record['slug'] for record in new]
+        ).values_list('slug', 'id'))
+
+    def import_posts(self, batch):
+        previous = self.old_post_ids[-1] if self.old_post_ids else 0
+        for record in batch:
+            if record['id'] <= previous:
+                raise CommandError('Посты должны идти по возрастанию id')
+            previous = record['id']
+        authors = self.user_ids([record['author'] for record in batch])
+        posts = bulk_insert(Post, [
+            Post(
+                author_id=author_id,
+                group_id=self.group_id(record),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                image=record['image'] or None,
+            )
+            for author_id, record in zip(authors, batch)
+        ])
+        for record, post in zip(batch, posts):
+            self.old_post_ids.append(record['id'])
+            self.new_post_ids.append(post.pk)
+
+    def import_comments(self, batch):
+        authors = self.user_ids([record['author'] for record in batch])
+        Comment.objects.bulk_create(
+            Comment(
+                post_id=self.post_id(record['post']),
+                author_id=author_id,
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            )
+            for author_id, record in zip(authors, batch)
+        )
+
+    def import_follows(self, batch):
+        users = self.user_ids([record['user'] for record in batch])
+        authors = self.user_ids([record['author'] for record in batch])
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in zip(users, authors)),
+            ignore_conflicts=True,
+        )
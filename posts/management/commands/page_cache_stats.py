@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import page_cache
+
+
+class Command(BaseCommand):
+    help = 'Печатает попадания и промахи кэша страниц для анонимных'
+
+    def handle(self, *args, **options):
+        stats = page_cache.stats()
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {stats["hit_ratio"]:.1%}'
+        )
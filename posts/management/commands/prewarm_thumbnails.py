@@ -0,0 +1,33 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь миниатюры всех картинок постов; '
+            'с --run сразу их нарезает')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--run', action='store_true',
+            help='после постановки в очередь запустить thumbnail_worker'
+        )
+        parser.add_argument('--processes', type=int)
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct()
+        count = 0
+        for image in images.iterator():
+            if image.startswith('posts/'):
+                thumbnails.enqueue_presets(image)
+                count += 1
+        self.stdout.write(f'Картинок в очереди: {count}')
+        if options['run']:
+            worker_options = {'once': True, 'stdout': self.stdout}
+            if options['processes']:
+                worker_options['processes'] = options['processes']
+            call_command('thumbnail_worker', **worker_options)
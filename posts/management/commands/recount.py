@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев, записей и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='только эти пользователи (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('id', flat=True))
+        fixed_profiles, fixed_posts = recount(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено профилей: {fixed_profiles}, постов: {fixed_posts}'
+        ))
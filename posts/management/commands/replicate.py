@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copy_database(source, target):
+    """Копия файла SQLite через backup API: согласованный снимок даже
+    при одновременной записи в источник."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target, timeout=20)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+class Command(BaseCommand):
+    help = ('Заменитель репликации для локальной проверки: раз в '
+            '--interval секунд копирует основную базу SQLite '
+            'в файлы реплик из DATABASE_REPLICAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true', help='скопировать один раз'
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        if 'sqlite' not in primary['ENGINE']:
+            raise CommandError('Команда копирует только файлы SQLite')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплик нет: задайте пути в YATUBE_DB_REPLICAS'
+            )
+        targets = [connections[alias].settings_dict['NAME']
+                   for alias in settings.DATABASE_REPLICAS]
+        while True:
+            started = time.perf_counter()
+            for target in targets:
+                copy_database(primary['NAME'], target)
+            self.stdout.write(
+                f'Скопировано в {len(targets)} реплик(и) за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
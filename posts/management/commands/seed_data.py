@@ -0,0 +1,171 @@
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from posts.bulk import explicit_dates
+from posts.counters import recount
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'лето город море кошка собака книга поезд дорога вечер утро друг '
+    'работа отпуск фото музыка кино горы лес река дождь снег кофе '
+    'новость проект код тест релиз ошибка идея план выходные'
+).split()
+
+
+def zipf_weights(count, exponent):
+    """Веса вида 1/rank^s: немногие получают почти всё."""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу большим набором данных через bulk_create: '
+            'пользователи, группы, посты, комментарии и подписки '
+            'со степенным распределением')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='среднее число подписок на пользователя'
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='показатель степенного закона популярности авторов'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch', type=int, default=None,
+            help='строк в одном INSERT (по умолчанию — предел СУБД)'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи {prefix}_* уже есть, укажите другой --prefix'
+            )
+        self.random = random.Random(options['seed'])
+        self.batch = options['batch']
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'])
+            groups = self.create_groups(prefix, options['groups'])
+            # чем популярнее автор, тем больше он пишет и тем больше
+            # у него подписчиков
+            weights = zipf_weights(len(users), options['exponent'])
+            posts = self.create_posts(
+                users, weights, groups, options['posts'], options['days']
+            )
+            self.create_comments(users, posts, options['comments'])
+            follows = self.create_follows(users, weights, options['follows'])
+            # bulk_create обходит сигналы: счётчики, ленты и кэши
+            # приводятся в порядок целиком
+            recount([user.pk for user in users])
+        call_command('backfill_feeds', stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, групп: {len(groups)}, '
+            f'постов: {len(posts)}, подписок: {follows}'
+        ))
+
+    def create_users(self, prefix, count):
+        # один хэш на всех: make_password на каждого занял бы минуты
+        password = make_password(prefix)
+        User.objects.bulk_create(
+            (User(username=f'{prefix}_{i}', password=password)
+             for i in range(count)),
+            batch_size=self.batch,
+        )
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).order_by('id'))
+
+    def create_groups(self, prefix, count):
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'{prefix}-{i}',
+                  description=f'Сообщество номер {i}')
+            for i in range(count)
+        )
+        return list(Group.objects.filter(slug__startswith=f'{prefix}-'))
+
+    def text(self, low, high):
+        return ' '.join(
+            self.random.choices(WORDS, k=self.random.randint(low, high))
+        ).capitalize()
+
+    def create_posts(self, users, weights, groups, count, days):
+        now = timezone.now()
+        step = timedelta(days=days) / max(count, 1)
+        authors = self.random.choices(users, weights, k=count)
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            Post.objects.bulk_create(
+                (Post(
+                    author=author,
+                    group=(self.random.choice(groups)
+                           if groups and self.random.random() < 0.5
+                           else None),
+                    text=self.text(5, 60),
+                    pub_date=now - step * (count - i),
+                ) for i, author in enumerate(authors)),
+                batch_size=self.batch,
+            )
+        return list(Post.objects.filter(
+            author__in=users
+        ).values_list('id', 'pub_date'))
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+        # обсуждают в основном немногие посты
+        weights = zipf_weights(len(posts), 1.0)
+        order = list(posts)
+        self.random.shuffle(order)
+        targets = self.random.choices(order, weights, k=count)
+        with explicit_dates(Comment._meta.get_field('created')):
+            Comment.objects.bulk_create(
+                (Comment(
+                    post_id=post_id,
+                    author=self.random.choice(users),
+                    text=self.text(2, 20),
+                    created=pub_date + timedelta(
+                        minutes=self.random.randint(1, 60 * 24)
+                    ),
+                ) for post_id, pub_date in targets),
+                batch_size=self.batch,
+            )
+
+    def create_follows(self, users, weights, average):
+        """Подписки: число у читателя — экспоненциальное, выбор
+        авторов — по весам популярности, поэтому входящие степени
+        распределены по степенному закону."""
+        pairs = set()
+        # накопленные веса один раз: choices с weights пересчитывает
+        # их при каждом вызове, и на пользователя выходит O(users)
+        cum_weights = list(itertools.accumulate(weights))
+        for user in users:
+            wanted = min(
+                int(self.random.expovariate(1 / average)) if average else 0,
+                len(users) - 1,
+            )
+            for author in self.random.choices(
+                    users, cum_weights=cum_weights, k=wanted):
+                if author.pk != user.pk:
+                    pairs.add((user.pk, author.pk))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs),
+            batch_size=self.batch, ignore_conflicts=True,
+        )
+        return len(pairs)
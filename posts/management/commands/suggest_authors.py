@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import page_cache, suggestions, versions
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Считает по графу подписок «кого почитать» для каждого '
+            'читателя и «с этим автором читают» для каждого автора '
+            'и складывает списки в кэш')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fanout', type=int, default=settings.SUGGESTIONS_FANOUT,
+            help='сколько свежих подписок читателя учитывать'
+        )
+        parser.add_argument(
+            '--sample', type=int, default=settings.SUGGESTIONS_SAMPLE,
+            help='сколько свежих подписчиков автора учитывать'
+        )
+        parser.add_argument(
+            '--related', type=int, default=settings.SUGGESTIONS_RELATED
+        )
+        parser.add_argument(
+            '--limit', type=int, default=settings.SUGGESTIONS_STORED,
+            help='сколько рекомендаций хранить на читателя'
+        )
+        parser.add_argument(
+            '--timeout', type=int, default=settings.SUGGESTIONS_TIMEOUT
+        )
+        parser.add_argument(
+            '--batch', type=int, default=500,
+            help='записей в одном cache.set_many'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = suggestions.Graph(
+            options['fanout'], options['sample'], options['related']
+        )
+        self.stdout.write(
+            f'Граф: пользователей до {graph.size}, '
+            f'подписок {len(graph.following.targets)}, '
+            f'подписчиков {len(graph.followers.targets)}, '
+            f'{time.monotonic() - started:.1f} с'
+        )
+        timeout, batch = options['timeout'], options['batch']
+        readers = authors = 0
+        personal, related = {}, {}
+        for vertex in range(1, graph.size + 1):
+            if graph.following[vertex]:
+                personal[vertex] = graph.suggest(vertex, options['limit'])
+                readers += 1
+            if graph.related[vertex]:
+                related[vertex] = list(graph.related[vertex])
+                authors += 1
+            if len(personal) >= batch:
+                suggestions.store(personal, suggestions.USER_KEY, timeout)
+                personal = {}
+            if len(related) >= batch:
+                self.store_related(related, timeout)
+                related = {}
+        suggestions.store(personal, suggestions.USER_KEY, timeout)
+        self.store_related(related, timeout)
+        popular = list(User.objects.order_by(
+            '-profile__followers_count', 'id'
+        ).values_list('id', flat=True)[:options['limit']])
+        suggestions.store({'': popular}, suggestions.POPULAR_KEY, timeout)
+        # ETag страниц с блоком рекомендаций устарели
+        versions.touch('suggestions')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {readers} читателям, {authors} авторам, '
+            f'{time.monotonic() - started:.1f} с'
+        ))
+
+    @staticmethod
+    def store_related(related, timeout):
+        suggestions.store(related, suggestions.RELATED_KEY, timeout)
+        # гостям профиль с блоком «с этим автором читают» отдаётся
+        # из кэша страниц
+        page_cache.invalidate(*page_cache.profile_paths(*related))
@@ -0,0 +1,49 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Разбирает очередь миниатюр пулом процессов (по одному на ядро)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='размер пула (по умолчанию число ядер)'
+        )
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='пауза, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='разобрать очередь и выйти'
+        )
+
+    def handle(self, *args, **options):
+        pool = None
+        if options['processes'] > 1:
+            # дочерние процессы не должны делить соединения с родителем
+            connections.close_all()
+            pool = multiprocessing.Pool(options['processes'])
+        total = 0
+        try:
+            while True:
+                jobs = thumbnails.claim_jobs(options['batch'])
+                if jobs:
+                    total += thumbnails.run_jobs(jobs, pool)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write(self.style.SUCCESS(f'Миниатюр готово: {total}'))
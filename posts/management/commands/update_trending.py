@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import trending
+from yatube.cache import is_shared
+
+
+class Command(BaseCommand):
+    help = ('Фоновый обновлятель популярного: раз в --interval секунд '
+            'остужает «температуру» постов и групп и кладёт топ в кэш')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=settings.TRENDING_INTERVAL
+        )
+        parser.add_argument(
+            '--once', action='store_true', help='обновить один раз'
+        )
+
+    def handle(self, *args, **options):
+        if not is_shared():
+            # топ, метка затухания и поколение страницы остались бы
+            # в памяти этого процесса, веб-воркеры их не увидят
+            raise CommandError(
+                'Нужен общий кэш (YATUBE_CACHE=shared): '
+                'с кэшем процесса топ не дойдёт до веб-воркеров'
+            )
+        while True:
+            started = time.perf_counter()
+            trending.decay()
+            posts, groups = trending.refresh()
+            self.stdout.write(
+                f'В топе постов: {len(posts)}, групп: {len(groups)}, '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255)),
+                ('geometry', models.CharField(max_length=50)),
+                ('options', models.TextField(default='{}')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='thumbnailjob',
+            constraint=models.UniqueConstraint(fields=('image', 'geometry'), name='uni_thumbnail_job'),
+        ),
+    ]
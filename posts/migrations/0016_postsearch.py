@@ -0,0 +1,80 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+# Индекс внешнего содержимого: текст не дублируется, FTS5 читает его
+# из представления, где «ё» заменена на «е» (unicode61 их не склеивает,
+# а стеммер запроса всегда даёт «е»)
+FORWARD_SQL = [
+    '''CREATE VIEW posts_post_fts_content AS
+       SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') AS text
+       FROM posts_post''',
+    '''CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+           text,
+           content='posts_post_fts_content',
+           content_rowid='id',
+           tokenize='unicode61 remove_diacritics 2',
+           prefix='2 3'
+       )''',
+    '''CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post
+       BEGIN
+           INSERT INTO posts_post_fts (rowid, text) VALUES (
+               new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+       END''',
+    '''CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post
+       BEGIN
+           INSERT INTO posts_post_fts (posts_post_fts, rowid, text) VALUES (
+               'delete', old.id,
+               replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+       END''',
+    '''CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+       BEGIN
+           INSERT INTO posts_post_fts (posts_post_fts, rowid, text) VALUES (
+               'delete', old.id,
+               replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+           INSERT INTO posts_post_fts (rowid, text) VALUES (
+               new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+       END''',
+    "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')",
+]
+
+BACKWARD_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+    'DROP VIEW IF EXISTS posts_post_fts_content',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # на других СУБД поиск идёт без индекса (posts/search.py)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='posts.Post')),
+                ('text', posts.models.SearchTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(_run(FORWARD_SQL), _run(BACKWARD_SQL)),
+    ]
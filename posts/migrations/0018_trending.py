@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_follow_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingGroup',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Group')),
+                ('score', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post')),
+                ('score', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingpost',
+            index=models.Index(fields=['-score'], name='trending_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendinggroup',
+            index=models.Index(fields=['-score'], name='trending_group_idx'),
+        ),
+    ]
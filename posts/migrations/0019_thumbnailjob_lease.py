@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='lease',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
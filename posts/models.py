@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -16,6 +18,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно includes/post_item.html, одним запросом.
+
+        Количество комментариев берётся из денормализованного
+        comments_count, поэтому отдельных COUNT на пост нет.
+        """
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Сообщение", help_text='Дайте короткое ША происходящему'
@@ -30,13 +42,56 @@ class Post(models.Model):
     )
     # поле для картинки
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # JSON с адаптивными вариантами картинки (posts/image_variants.py)
+    image_variants = models.TextField(blank=True, editable=False)
+    # денормализованный счётчик, ведётся сигналами posts/signals.py
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # версия отрисованного фрагмента includes/post_item.html,
+    # сдвигается в posts/fragments.py при любом его изменении
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    # поля, которые меняются только атомарным UPDATE ... F()
+    COUNTER_FIELDS = ('comments_count', 'version')
 
     class Meta:
-        ordering = ["-pub_date"]
+        # id разрешает совпадения pub_date, на этой паре
+        # строится курсорная пагинация (posts/paginator.py)
+        ordering = ["-pub_date", "-id"]
+        # индексы повторяют сортировку лент, чтобы СУБД не сортировала
+        # выборку, а читала страницу прямо из индекса
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def variants(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
+    def save(self, *args, **kwargs):
+        # при редактировании не затираем счётчики устаревшим значением
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -48,18 +103,151 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField("date published", auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'], name='comment_post_idx')
+        ]
+
 
 class Follow(models.Model):
     # ссылка на объект пользователя, который подписывается
+    # (индекс по user — follow_user_idx)
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="follower"
+        User, on_delete=models.CASCADE, related_name="follower",
+        db_index=False,
     )
     # ссылка на объект пользователя, на которого подписываются
     author = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="following"
+        User, on_delete=models.CASCADE, related_name="following",
+        db_index=False,
     )
 
     class Meta:
+        # уникальный индекс (author_id, user_id) обслуживает проверку
+        # «подписан ли user на author»
         constraints = [
             models.UniqueConstraint(fields=['author', 'user'], name='uni_foll')
         ]
+        # списки подписчиков и подписок листаются курсором по id
+        # и заменяют индексы внешних ключей
+        indexes = [
+            models.Index(fields=['author', '-id'], name='follow_author_idx'),
+            models.Index(fields=['user', '-id'], name='follow_user_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись готовой ленты подписок (fan-out-on-write).
+
+    Заполняется сигналами из posts/signals.py; pub_date скопирована из
+    поста, чтобы лента читалась одним проходом по индексу.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="feed"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='uni_feed')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'], name='feed_user_idx'
+            )
+        ]
+
+
+class TrendingPost(models.Model):
+    """Затухающая «температура» поста (posts/trending.py).
+
+    Строка появляется с первым комментарием и удаляется, когда пост
+    остыл, поэтому таблица не больше числа недавно обсуждавшихся постов.
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True,
+        related_name='trending',
+    )
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_post_idx')
+        ]
+
+
+class TrendingGroup(models.Model):
+    """Затухающая частота новых постов группы (posts/trending.py)."""
+    group = models.OneToOneField(
+        Group, on_delete=models.CASCADE, primary_key=True,
+        related_name='trending',
+    )
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_group_idx')
+        ]
+
+
+class ThumbnailJob(models.Model):
+    """Очередь миниатюр, которые ещё предстоит нарезать.
+
+    Разбирается командой thumbnail_worker (posts/thumbnails.py).
+    """
+    image = models.CharField(max_length=255)
+    geometry = models.CharField(max_length=50)
+    # параметры sorl-thumbnail в JSON (crop, upscale, ...)
+    options = models.TextField(default='{}')
+    created = models.DateTimeField(auto_now_add=True)
+    # задачу забрал воркер: до leased_until её не берут другие, а если
+    # воркер упал, после этого времени она снова свободна
+    lease = models.CharField(max_length=32, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image', 'geometry'], name='uni_thumbnail_job'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.image} {self.geometry}'
+
+
+class SearchTextField(models.TextField):
+    """Колонка полнотекстового индекса, поддерживает lookup match."""
+
+
+@SearchTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """Полнотекстовый индекс постов, виртуальная таблица FTS5.
+
+    Таблицу и триггеры, которые держат её в актуальном состоянии,
+    создаёт миграция 0016 (только на SQLite); запросы — posts/search.py.
+    """
+    post = models.OneToOneField(
+        Post, primary_key=True, db_column='rowid',
+        on_delete=models.DO_NOTHING, related_name='+',
+    )
+    text = SearchTextField()
+    # bm25 совпадения, меньше — лучше; заполнен только вместе с MATCH
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
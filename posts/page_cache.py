@@ -0,0 +1,166 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+Ключ страницы — путь и строка запроса плюс поколения путей, от
+которых она зависит. Сигналы (posts/signals.py) переводят изменение
+поста, комментария, группы или подписки в список затронутых адресов
+и сдвигают их поколения, поэтому все варианты страницы (курсоры,
+параметры) устаревают сразу, а не по истечении PAGE_CACHE_TIMEOUT.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve, reverse
+
+from yatube.cache import is_shared
+
+from .models import Post, User
+
+KEY_PREFIX = 'page:'
+GENERATION_PREFIX = 'page:gen:'
+# поколение для всех страниц сразу (правка группы видна везде)
+ALL_PAGES = '*'
+STATS_KEYS = {'hits': 'page:stats:hits', 'misses': 'page:stats:misses'}
+
+
+def _generation_key(path):
+    return GENERATION_PREFIX + hashlib.md5(path.encode()).hexdigest()
+
+
+def invalidate(*paths):
+    cache.set_many(
+        {_generation_key(path): uuid.uuid4().hex for path in paths}, None
+    )
+
+
+def _generations(paths):
+    keys = [_generation_key(path) for path in paths]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # поколение потерялось: старые записи страницы больше не найти
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def post_paths(post, username=None, group_slug=None):
+    """Адреса, на которых виден пост."""
+    username = username or post.author.username
+    paths = [
+        reverse('index'),
+        reverse('profile', args=[username]),
+        reverse('post', args=[username, post.pk]),
+    ]
+    if group_slug is None and post.group_id is not None:
+        group_slug = post.group.slug
+    if group_slug is not None:
+        paths.append(reverse('group_posts', args=[group_slug]))
+    return paths
+
+
+def post_paths_by_id(post_id):
+    """Как post_paths, но по id: для комментариев и миниатюр."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if row is None:
+        return []
+    username, group_slug = row
+    return post_paths(
+        Post(pk=post_id), username=username, group_slug=group_slug
+    )
+
+
+def profile_paths(*user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True
+    )
+    return [reverse('profile', args=[name]) for name in usernames]
+
+
+def _dependencies(request):
+    """Пути, от которых зависит страница, или None, если её не кэшируем."""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    # при попадании view не вызывается, а метрикам нужно имя адреса
+    request.resolver_match = match
+    if match.view_name not in settings.PAGE_CACHE_VIEWS:
+        return None
+    paths = [ALL_PAGES, request.path_info]
+    if match.view_name == 'post':
+        # карточка автора со счётчиками — как на странице профиля
+        paths.append(reverse('profile', args=[match.kwargs['username']]))
+    elif match.view_name == 'trending':
+        # посты топа видны и на главной: правка поста сбрасывает обе
+        paths.append(reverse('index'))
+    return paths
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def stats():
+    hits = cache.get(STATS_KEYS['hits'], 0)
+    misses = cache.get(STATS_KEYS['misses'], 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0.0,
+    }
+
+
+class AnonymousPageCacheMiddleware:
+    """Отдаёт анонимным GET-запросам готовые страницы лент из кэша.
+
+    Стоит после AuthenticationMiddleware: вошедшим пользователям
+    страницы рисуются как обычно. С кэшем, своим у каждого процесса,
+    не включается: сигнал сдвинул бы поколения только в одном воркере,
+    а остальные отдавали бы старую страницу до PAGE_CACHE_TIMEOUT.
+    """
+
+    def __init__(self, get_response):
+        if not is_shared():
+            raise MiddlewareNotUsed('кэшу страниц нужен общий кэш')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return self.get_response(request)
+        paths = _dependencies(request)
+        if paths is None:
+            return self.get_response(request)
+        raw = ' '.join([request.get_full_path(), *_generations(paths)])
+        key = KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+        response = cache.get(key)
+        if response is not None:
+            _count('hits')
+            response['X-Page-Cache'] = 'HIT'
+            return response
+        _count('misses')
+        response = self.get_response(request)
+        if self._cacheable(response):
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def _cacheable(response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', '')
+        )
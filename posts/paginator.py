@@ -0,0 +1,167 @@
+import base64
+import json
+
+from django.db.models import Q
+
+# направления перехода, зашитые в токен курсора
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _json_default(value):
+    # DjangoJSONEncoder обрезает микросекунды, а курсору нужна точность
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которой пользуются шаблоны: итерация, len, индексы, has_next и т.д.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация без COUNT(*) и OFFSET.
+
+    Страница выбирается условием по полям сортировки
+    (по умолчанию pub_date и id, как в Post.Meta.ordering),
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 transform=None):
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.object_list = object_list.order_by(*self.ordering)
+        # transform позволяет отдать в шаблон не сами строки,
+        # а связанные с ними объекты (например, посты записей ленты)
+        self.transform = transform
+
+    def encode_cursor(self, direction, obj):
+        values = [self._get_value(obj, name) for name in self.fields]
+        raw = json.dumps([direction, values], default=_json_default)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()).decode()
+            )
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidCursor(token)
+        if direction not in (NEXT, PREVIOUS) or (
+                not isinstance(values, list)
+                or len(values) != len(self.fields)):
+            raise InvalidCursor(token)
+        model = self.object_list.model
+        try:
+            values = [
+                self._get_field(model, name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise InvalidCursor(token)
+        return direction, values
+
+    def seek(self, cursor=None):
+        """Queryset страницы (ещё без среза) и направление перехода."""
+        if cursor is None:
+            return self.object_list, None
+        direction, values = self.decode_cursor(cursor)
+        if direction == NEXT:
+            return self.object_list.filter(self._seek(values)), direction
+        queryset = self.object_list.filter(self._seek(values, reverse=True))
+        return queryset.reverse(), direction
+
+    def page(self, cursor=None):
+        return self._build_page(*self.seek(cursor))
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор даёт первую страницу."""
+        try:
+            return self.page(cursor or None)
+        except InvalidCursor:
+            return self.page()
+
+    def _build_page(self, queryset, direction):
+        # берём на одну строку больше, чтобы узнать, есть ли продолжение
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction == NEXT
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(NEXT, rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(PREVIOUS, rows[0])
+        if self.transform is not None:
+            rows = self.transform(rows)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def _seek(self, values, reverse=False):
+        # (a, b) после (x, y) при сортировке по убыванию:
+        # a <= x AND (a < x OR (a = x AND b < y));
+        # a <= x дублирует условие, но даёт СУБД границу диапазона
+        # в индексе, иначе OR читается сканированием с начала
+        condition = Q()
+        equal = {}
+        for ordering, name, value in zip(self.ordering, self.fields, values):
+            descending = ordering.startswith('-') != reverse
+            lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        name, value = self.fields[0], values[0]
+        descending = self.ordering[0].startswith('-') != reverse
+        bound = '%s__%s' % (name, 'lte' if descending else 'gte')
+        return Q(**{bound: value}) & condition
+
+    @staticmethod
+    def _get_field(model, name):
+        field = model._meta.get_field(name)
+        return field.target_field if field.is_relation else field
+
+    @staticmethod
+    def _get_value(obj, name):
+        field = obj._meta.get_field(name)
+        return getattr(obj, field.attname)
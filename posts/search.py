@@ -0,0 +1,89 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite запрос идёт в индекс FTS5 (PostSearch, миграция 0016):
+слова запроса приводятся к основе стеммером Snowball и ищутся как
+префиксы, поэтому «кошками» находит «кошка» и «кошки». Результаты
+упорядочены по bm25, листаются курсором по (rank, post_id).
+"""
+import re
+
+import snowballstemmer
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, PostSearch
+
+# слов запроса больше этого числа не учитываем
+MAX_TERMS = 10
+# основа короче — ищем слово целиком, иначе префикс совпадёт с половиной
+# словаря
+MIN_PREFIX = 3
+# число слов во фрагменте с подсветкой
+SNIPPET_TOKENS = 24
+# служебные символы вместо <mark>: текст поста экранируется после snippet()
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_stemmers = {
+    'russian': snowballstemmer.stemmer('russian'),
+    'english': snowballstemmer.stemmer('english'),
+}
+_CYRILLIC = re.compile('[а-я]')
+
+
+def _stem(word):
+    language = 'russian' if _CYRILLIC.search(word) else 'english'
+    return _stemmers[language].stemWord(word)
+
+
+def build_query(text):
+    """Строка запроса FTS5 из пользовательского ввода, '' если слов нет.
+
+    Все слова обязательны (AND), операторы FTS5 из ввода не проходят:
+    каждое слово берётся в кавычки.
+    """
+    words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+    terms = []
+    for word in words[:MAX_TERMS]:
+        stem = _stem(word)
+        if len(stem) >= MIN_PREFIX:
+            terms.append(f'"{stem}"*')
+        else:
+            terms.append(f'"{word}"')
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и превращает маркеры совпадений в <mark>."""
+    return mark_safe(
+        escape(snippet).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+    )
+
+
+def _entries_to_posts(entries):
+    posts = []
+    for entry in entries:
+        entry.post.snippet = highlight(entry.snippet)
+        posts.append(entry.post)
+    return posts
+
+
+def search_paginator_args(text):
+    """Queryset, сортировка и transform для CursorPaginator.
+
+    Без FTS5 (не SQLite) поиск сводится к icontains по свежим постам.
+    """
+    if connection.vendor != 'sqlite':
+        posts = Post.objects.for_feed().filter(text__icontains=text)
+        return posts, ('-pub_date', '-id'), None
+    query = build_query(text)
+    if not query:
+        return PostSearch.objects.none(), ('rank', 'post_id'), None
+    entries = PostSearch.objects.filter(text__match=query).select_related(
+        'post', 'post__author', 'post__group'
+    ).defer('text').annotate(snippet=RawSQL(
+        'snippet(posts_post_fts, 0, %s, %s, %s, %s)',
+        (_OPEN, _CLOSE, '…', SNIPPET_TOKENS),
+    ))
+    return entries, ('rank', 'post_id'), _entries_to_posts
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import (counters, feed, follow_cache, fragments, image_variants,
+               page_cache, trending, versions)
+from .models import Comment, Follow, Group, Post
+
+# Счётчики меняются через F() в той же транзакции, что и сама запись
+# (пишущие view обёрнуты в transaction.atomic), поэтому не расходятся
+# при одновременных запросах. Расхождения чинит команда recount.
+#
+# Метки versions и поколения page_cache, наоборот, сдвигаются только
+# после COMMIT: иначе читатель между сдвигом и COMMIT получит новый
+# ключ со старыми строками и закэширует их на весь PAGE_CACHE_TIMEOUT.
+# Что именно сдвигать, вычисляется сразу, пока строки ещё видны.
+
+
+def _after_commit(func, *args):
+    if args:
+        transaction.on_commit(lambda: func(*args))
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, **kwargs):
+    # пост могли перенести в другую группу: её лента тоже изменилась
+    if instance.pk is not None:
+        old_group, old_slug, old_image, old_variants = Post.objects.filter(
+            pk=instance.pk
+        ).values_list(
+            'group_id', 'group__slug', 'image', 'image_variants'
+        ).first() or (None, None, None, '')
+        # картинку сменили: варианты старой удаляются, когда правка
+        # сохранится
+        if old_image is not None and old_image != instance.image.name:
+            _after_commit(
+                image_variants.delete_files,
+                *image_variants.variant_paths(old_variants),
+            )
+        if old_group is not None and old_group != instance.group_id:
+            _after_commit(versions.touch, f'group:{old_group}')
+            _after_commit(
+                page_cache.invalidate,
+                reverse('group_posts', args=[old_slug]),
+            )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_profile(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+        if instance.group_id is not None:
+            trending.post_added(instance.group_id)
+    else:
+        fragments.invalidate(instance.pk, instance.version)
+    _after_commit(versions.touch, *versions.post_scopes(
+        instance.pk, instance.author_id, instance.group_id
+    ))
+    _after_commit(page_cache.invalidate, *page_cache.post_paths(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_profile(instance.author_id, posts_count=-1)
+    fragments.forget(instance)
+    _after_commit(
+        image_variants.delete_files,
+        *image_variants.variant_paths(instance.image_variants),
+    )
+    _after_commit(versions.touch, *versions.post_scopes(
+        instance.pk, instance.author_id, instance.group_id
+    ))
+    _after_commit(page_cache.invalidate, *page_cache.post_paths(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+        trending.comment_added(instance.post_id)
+    _comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    _comment_changed(instance)
+
+
+def _comment_changed(comment):
+    fragments.invalidate(comment.post_id)
+    _after_commit(
+        versions.touch, *versions.post_scopes_by_id(comment.post_id)
+    )
+    _after_commit(
+        page_cache.invalidate, *page_cache.post_paths_by_id(comment.post_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        fragments.invalidate_group(instance.pk)
+        # название группы есть в её постах во всех лентах, правят
+        # группы редко, поэтому одна метка на все группы
+        _after_commit(versions.touch, 'groups')
+        _after_commit(page_cache.invalidate, page_cache.ALL_PAGES)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # посты группы останутся без неё через UPDATE ... SET group_id = NULL
+    # без сигналов Post; после него их уже не найти по group_id
+    fragments.invalidate_group(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    _after_commit(versions.touch, 'groups', f'group:{instance.pk}')
+    _after_commit(page_cache.invalidate, page_cache.ALL_PAGES)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_profile(instance.user_id, following_count=1)
+        counters.change_profile(instance.author_id, followers_count=1)
+        feed.add_author(instance.user_id, instance.author_id)
+        _touch_follow(instance)
+        _after_commit(
+            follow_cache.following.changed,
+            instance.user_id, instance.author_id, True,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_profile(instance.user_id, following_count=-1)
+    counters.change_profile(instance.author_id, followers_count=-1)
+    feed.remove_author(instance.user_id, instance.author_id)
+    _touch_follow(instance)
+    _after_commit(
+        follow_cache.following.changed,
+        instance.user_id, instance.author_id, False,
+    )
+
+
+def _touch_follow(follow):
+    # лента читателя и счётчики подписок в профилях обоих
+    _after_commit(
+        versions.touch, f'follow:{follow.user_id}',
+        f'author:{follow.user_id}', f'author:{follow.author_id}',
+    )
+    _after_commit(
+        page_cache.invalidate,
+        *page_cache.profile_paths(follow.user_id, follow.author_id),
+    )
@@ -0,0 +1,164 @@
+"""«Кого почитать»: авторы, найденные по графу подписок.
+
+Граф целиком считает команда suggest_authors. Подписки читаются
+потоком и складываются в два массива смежности (CSR) из чисел:
+offsets[u]..offsets[u + 1] — отрезок targets с соседями u. Хранятся
+только самые свежие SUGGESTIONS_FANOUT подписок пользователя
+и SUGGESTIONS_SAMPLE подписчиков автора, поэтому память ограничена
+числом пользователей, а не числом подписок.
+
+Оценка автора b для читателя u складывается из
+
+* друзей друзей: на b подписаны авторы, которых читает u
+  (FRIEND_WEIGHT за каждого);
+* совместных подписок: b часто читают вместе с авторами u
+  (related — по выборке подписчиков каждого автора).
+
+Готовые списки лежат в кэше: у читателя — его рекомендации,
+у автора — «с ним читают», у новичков без подписок — самые читаемые
+авторы. View только отфильтровывает тех, на кого читатель уже
+подписан (posts/follow_cache.py).
+"""
+import heapq
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from . import follow_cache
+from .models import Follow, User
+
+USER_KEY = 'suggest:user:'
+RELATED_KEY = 'suggest:related:'
+POPULAR_KEY = 'suggest:popular'
+# вес общего знакомого относительно одной совместной подписки
+FRIEND_WEIGHT = 2
+
+
+class Adjacency:
+    """Соседи вершин в двух плоских массивах."""
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    def __getitem__(self, vertex):
+        if vertex + 1 >= len(self.offsets):
+            return ()
+        return self.targets[self.offsets[vertex]:self.offsets[vertex + 1]]
+
+    @classmethod
+    def from_follows(cls, source, target, size, cap, chunk=10000):
+        """Из подписок по убыванию id: у каждого source не больше cap
+        самых свежих target. Идёт по индексу follow_<source>_idx."""
+        offsets = array('q', bytes(8 * (size + 2)))
+        targets = array('i')
+        current = kept = 0
+        rows = Follow.objects.order_by(source, '-id').values_list(
+            f'{source}_id', f'{target}_id'
+        ).iterator(chunk_size=chunk)
+        for vertex, neighbour in rows:
+            if vertex != current:
+                for skipped in range(current + 1, vertex + 1):
+                    offsets[skipped] = len(targets)
+                current, kept = vertex, 0
+            if kept < cap:
+                targets.append(neighbour)
+                kept += 1
+        for skipped in range(current + 1, size + 2):
+            offsets[skipped] = len(targets)
+        return cls(offsets, targets)
+
+
+class Graph:
+    def __init__(self, fanout, sample, related_count):
+        size = User.objects.aggregate(top=Max('id'))['top'] or 0
+        self.size = size
+        self.following = Adjacency.from_follows(
+            'user', 'author', size, fanout
+        )
+        self.followers = Adjacency.from_follows(
+            'author', 'user', size, sample
+        )
+        self.related_count = related_count
+        self.related = self._build_related()
+
+    def _co_followed(self, author):
+        """Авторы, которых чаще всего читают вместе с author."""
+        counts = Counter()
+        for reader in self.followers[author]:
+            counts.update(self.following[reader])
+        counts.pop(author, None)
+        return [other for other, _ in counts.most_common(self.related_count)]
+
+    def _build_related(self):
+        # списки «с ним читают» нужны каждому читателю автора, поэтому
+        # считаются один раз и тоже хранятся плоскими массивами
+        offsets = array('q', bytes(8 * (self.size + 2)))
+        targets = array('i')
+        for author in range(1, self.size + 1):
+            offsets[author] = len(targets)
+            if self.followers[author]:
+                targets.extend(self._co_followed(author))
+        offsets[self.size + 1] = len(targets)
+        return Adjacency(offsets, targets)
+
+    def suggest(self, user, limit):
+        followed = self.following[user]
+        excluded = set(followed)
+        excluded.add(user)
+        scores = Counter()
+        for author in followed:
+            for other in self.following[author]:
+                scores[other] += FRIEND_WEIGHT
+            for rank, other in enumerate(self.related[author]):
+                # первые в списке «с ним читают» весят больше
+                scores[other] += 1 - rank / (self.related_count + 1)
+        return [
+            other for other, _ in heapq.nlargest(
+                limit + len(excluded), scores.items(),
+                key=lambda item: (item[1], -item[0]),
+            ) if other not in excluded
+        ][:limit]
+
+
+def store(values, prefix, timeout):
+    cache.set_many(
+        {f'{prefix}{key}': value for key, value in values.items()}, timeout
+    )
+
+
+def _users(ids, exclude):
+    if not ids:
+        return []
+    # подписки читателя нужны, только если есть кого предложить
+    excluded = set(exclude())
+    ids = [pk for pk in ids
+           if pk not in excluded][:settings.SUGGESTIONS_SHOWN]
+    users = User.objects.select_related('profile').in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
+
+
+def _followed(user):
+    if not user.is_authenticated:
+        return set()
+    return {user.pk, *follow_cache.following.authors(user.pk)}
+
+
+def for_user(user):
+    """Рекомендации читателю без тех, на кого он уже подписан;
+    без подписок — самые читаемые авторы."""
+    if not user.is_authenticated:
+        return []
+    ids = cache.get(f'{USER_KEY}{user.pk}')
+    if ids is None:
+        ids = cache.get(POPULAR_KEY)
+    return _users(ids, lambda: _followed(user))
+
+
+def related_to(author, user):
+    """«С этим автором читают» на странице профиля."""
+    ids = cache.get(f'{RELATED_KEY}{author.pk}')
+    return _users(ids, lambda: _followed(user) | {author.pk})
@@ -0,0 +1,29 @@
+from django import template
+from django.conf import settings
+
+from posts.image_variants import picture_context
+from posts.thumbnails import thumbnail_or_placeholder
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry, **options):
+    """{% ready_thumbnail post.image "960x339" crop="center" as im %}
+
+    Как {% thumbnail %}, но не режет картинку во время запроса:
+    пока миниатюры нет, отдаёт заглушку или оригинал.
+    """
+    return thumbnail_or_placeholder(image, geometry, **options)
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post):
+    """<picture> из готовых вариантов, иначе обычная миниатюра."""
+    picture = picture_context(post)
+    if picture is None and post.image:
+        geometry, options = settings.POST_THUMBNAILS[0]
+        return {'thumbnail': thumbnail_or_placeholder(
+            post.image, geometry, **options
+        )}
+    return {'picture': picture}
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_serialized_with_cursor(self):
+        """ленты отдаются компактным JSON и листаются курсором"""
+        with override_settings(PAGINATOR_PAGE_SIZE=2):
+            response = self.client.get(reverse('api:index'))
+            data = response.json()
+            self.assertEqual(
+                [post['text'] for post in data['results']],
+                ['пост 2', 'пост 1'],
+            )
+            self.assertEqual(data['results'][0]['group'], 'group')
+            self.assertIn('"text":"пост 2"', response.content.decode())
+            data = self.client.get(
+                reverse('api:index'), {'cursor': data['next']}
+            ).json()
+        self.assertEqual([p['text'] for p in data['results']], ['пост 0'])
+        self.assertIsNone(data['next'])
+        for url in (
+            reverse('api:group_posts', args=['group']),
+            reverse('api:profile', args=['author']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    len(self.client.get(url).json()['results']), 3
+                )
+        self.assertEqual(
+            self.client.get(reverse('api:profile', args=['nobody'])
+                            ).status_code, 404
+        )
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        """повторный запрос с ETag не трогает базу, новый пост меняет ETag"""
+        url = reverse('api:index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        with on_commit_callbacks():
+            Post.objects.create(text='новый', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_comment_changes_post_etag(self):
+        """комментарий меняет ETag поста, лента группы не зависит от чужих"""
+        post = self.posts[0]
+        url = reverse('api:post', args=['author', post.pk])
+        etag = self.client.get(url)['ETag']
+        group_url = reverse('api:group_posts', args=['group'])
+        group_etag = self.client.get(group_url)['ETag']
+        other = User.objects.create(username='other')
+        with on_commit_callbacks():
+            Post.objects.create(text='без группы', author=other)
+        self.assertEqual(self.client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag
+        ).status_code, 304)
+        with on_commit_callbacks():
+            Comment.objects.create(post=post, author=self.reader, text='к')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments']['results'][0]['text'],
+                         'к')
+
+    def test_follow_feed_requires_login(self):
+        """лента подписок: 401 без входа, своя версия у каждого читателя"""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        with on_commit_callbacks():
+            Follow.objects.filter(user=self.reader).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'], [])
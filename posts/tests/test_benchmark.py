@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Comment, FeedEntry, Follow, Post, User
+
+
+class SeedAndBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', users=60, groups=3, posts=300, comments=500,
+            follows=8, stdout=StringIO(),
+        )
+
+    def test_seed_creates_power_law_graph(self):
+        """seed_data создаёт данные и приводит в порядок счётчики и ленты"""
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        followers = sorted(
+            (user.profile.followers_count
+             for user in User.objects.select_related('profile')),
+            reverse=True,
+        )
+        self.assertEqual(sum(followers), Follow.objects.count())
+        # у самого популярного автора подписчиков много больше медианы
+        self.assertGreater(followers[0], 5 * max(followers[30], 1))
+        self.assertTrue(FeedEntry.objects.exists())
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertGreater((max(dates) - min(dates)).days, 300)
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, stdout=StringIO())
+
+    def test_benchmark_compares_with_baseline(self):
+        """рост числа запросов относительно базовой линии — ошибка"""
+        before = (Follow.objects.count(), FeedEntry.objects.count())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            out = StringIO()
+            call_command('benchmark', requests=3, warmup=1, baseline=path,
+                         save_baseline=True, stdout=out)
+            self.assertIn('follow_index', out.getvalue())
+            # подписка и отписка из прогона откатываются
+            self.assertEqual(
+                (Follow.objects.count(), FeedEntry.objects.count()), before
+            )
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.assertEqual(
+                set(baseline['index (гость)']),
+                {'p50', 'p95', 'p99', 'queries'},
+            )
+            call_command('benchmark', requests=3, warmup=1, baseline=path,
+                         tolerance=100, only=['index', 'post'],
+                         stdout=StringIO())
+            baseline['index']['queries'] -= 1
+            with open(path, 'w') as baseline_file:
+                json.dump(baseline, baseline_file)
+            with self.assertRaisesMessage(CommandError, 'index: запросов'):
+                call_command('benchmark', requests=3, warmup=1,
+                             baseline=path, only=['index'],
+                             stdout=StringIO())
+
+
+class EmptyBenchmarkTests(TestCase):
+    def test_needs_data(self):
+        """без пользователей или постов — понятная ошибка"""
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            call_command('benchmark', stdout=StringIO())
+        User.objects.create(username='alone')
+        User.objects.create(username='friend')
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            call_command('benchmark', stdout=StringIO())
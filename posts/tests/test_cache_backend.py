@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SharedFileCache
+
+
+def make_cache(path, **options):
+    return SharedFileCache(path, {'OPTIONS': options})
+
+
+def increment(path, times):
+    cache = make_cache(path)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SharedFileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """set/get/add/delete и истечение срока"""
+        self.cache.set('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.assertTrue(self.cache.add('new', 'значение'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('short', 1, timeout=0.05)
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get('short', 'нет'), 'нет')
+        self.assertTrue(self.cache.add('short', 2))
+
+    def test_visible_from_other_instance(self):
+        """другой процесс (экземпляр) видит те же записи"""
+        self.cache.set('key', 'значение')
+        self.assertEqual(make_cache(self.path).get('key'), 'значение')
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет приращений"""
+        self.cache.set('counter', 0)
+        processes = [
+            multiprocessing.Process(target=increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'строка')
+        with self.assertRaises(TypeError):
+            self.cache.incr('text')
+
+    def test_lru_eviction(self):
+        """при переполнении вытесняются давно не читанные записи"""
+        cache = make_cache(self.path, MAX_ENTRIES=10, CULL_EVERY=1)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        # свежее чтение защищает key0 от вытеснения
+        cache._connection().execute(
+            "UPDATE cache SET accessed = accessed - 100 WHERE key != ':1:key0'"
+        )
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertLessEqual(cache.get_stats()['entries'], 10)
+        self.assertGreater(cache.get_stats()['evictions'], 0)
+
+    def test_stats(self):
+        """статистика попаданий и промахов"""
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get('missing')
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, User
+from users.models import Profile
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+
+    def test_counters_follow_changes(self):
+        """счётчики меняются вместе с постами, комментариями и подписками"""
+        post = Post.objects.create(text='пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        Follow.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_edit_does_not_overwrite_counter(self):
+        """сохранение устаревшего экземпляра не затирает счётчик"""
+        post = Post.objects.create(text='пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        post.text = 'правка'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        """recount исправляет разошедшиеся счётчики"""
+        post = Post.objects.create(text='пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        Post.objects.update(comments_count=7)
+        Profile.objects.update(posts_count=5)
+        call_command('recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.reader).posts_count, 0)
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+def sqlite_handler(path, **overrides):
+    profile = settings.DATABASE_PROFILES['sqlite']
+    options = {**profile['OPTIONS'], **overrides.pop('OPTIONS', {})}
+    return ConnectionHandler({'default': {
+        **profile, 'NAME': path, 'OPTIONS': options, **overrides,
+    }})
+
+
+class TempDatabaseTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.addCleanup(
+            lambda: [os.remove(os.path.join(directory, name))
+                     for name in os.listdir(directory)]
+        )
+
+
+class SqliteBackendTests(TempDatabaseTestCase):
+    def test_pragmas_applied_on_connect(self):
+        """каждое новое соединение получает PRAGMA из профиля"""
+        connection = sqlite_handler(self.path)['default']
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            values = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout',
+                         'mmap_size'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        self.assertEqual(values, {
+            'journal_mode': 'wal', 'synchronous': 1,
+            'busy_timeout': 20000, 'mmap_size': 268435456,
+        })
+
+    def write_concurrently(self, **overrides):
+        """Две транзакции «прочитать, подумать, записать» одновременно,
+        как два воркера с комментариями; возвращает ошибки."""
+        handler = sqlite_handler(self.path, **overrides)
+        with handler['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS t (n INTEGER)')
+        handler['default'].close()
+        errors = []
+
+        def writer():
+            connection = handler['default']
+            try:
+                connection.ensure_connection()
+                connection._start_transaction_under_autocommit()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT count(*) FROM t')
+                    time.sleep(0.2)
+                    cursor.execute('INSERT INTO t VALUES (1)')
+                    cursor.execute('COMMIT')
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_writers_wait(self):
+        """BEGIN IMMEDIATE: вторая запись ждёт первую, а не падает"""
+        self.assertEqual(self.write_concurrently(), [])
+
+    def test_deferred_transactions_lock(self):
+        """без transaction_mode та же нагрузка даёт database is locked"""
+        errors = self.write_concurrently(
+            OPTIONS={'transaction_mode': None, 'timeout': 1}
+        )
+        self.assertEqual(len(errors), 1)
+        self.assertIn('locked', str(errors[0]))
+
+    def test_bulk_batches_use_connection_limit(self):
+        """bulk_create пишет порциями по пределу параметров соединения"""
+        connection = sqlite_handler(self.path)['default']
+        self.addCleanup(connection.close)
+        fields = ['user', 'post', 'pub_date']
+        self.assertGreater(
+            connection.ops.bulk_batch_size(fields, []), 999 // len(fields)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (n INTEGER)')
+            sql = connection.ops.bulk_insert_sql(
+                ['n'], [['%s']] * 2000
+            )
+            cursor.execute(f'INSERT INTO t (n) {sql}', list(range(2000)))
+            cursor.execute('SELECT count(*) FROM t')
+            self.assertEqual(cursor.fetchone()[0], 2000)
+
+
+class HealthCheckTests(TempDatabaseTestCase):
+    # соединение с :memory: бэкенд не закрывает никогда
+    def test_dead_connection_replaced_on_next_request(self):
+        """мёртвое постоянное соединение заменяется в начале запроса"""
+        connection = sqlite_handler(self.path)['default']
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        first = connection.connection
+        with mock.patch.object(type(connection), 'is_usable',
+                               return_value=False):
+            # внутри запроса соединение не проверяется повторно
+            connection.ensure_connection()
+            self.assertIs(connection.connection, first)
+            # граница запроса: request_started
+            connection.close_if_unusable_or_obsolete()
+            connection.ensure_connection()
+        self.assertIsNot(connection.connection, first)
+
+    def test_disabled_health_checks(self):
+        connection = sqlite_handler(
+            self.path, CONN_HEALTH_CHECKS=False
+        )['default']
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        first = connection.connection
+        with mock.patch.object(type(connection), 'is_usable',
+                               return_value=False):
+            connection.close_if_unusable_or_obsolete()
+            connection.ensure_connection()
+        self.assertIs(connection.connection, first)
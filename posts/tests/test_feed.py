@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed
+from posts.models import FeedEntry, Follow, Post, User
+
+
+class FeedFanOutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.star = User.objects.create(username='star')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_texts(self):
+        response = self.client.get(reverse('follow_index'))
+        return [post.text for post in response.context['page']]
+
+    def test_post_is_fanned_out_to_followers(self):
+        """новый пост попадает в готовую ленту подписчика"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='новый', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_texts(), ['новый'])
+
+    def test_follow_and_unfollow_update_feed(self):
+        """подписка переносит старые посты, отписка их убирает"""
+        Post.objects.create(text='старый', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_texts(), ['старый'])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed_texts(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_read_on_demand(self):
+        """посты популярного автора не раскладываются, но видны в ленте"""
+        Follow.objects.create(user=self.author, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='обычный', author=self.author)
+        Post.objects.create(text='звёздный', author=self.star)
+        self.assertFalse(FeedEntry.objects.filter(post__author=self.star))
+        self.assertEqual(self.feed_texts(), ['звёздный', 'обычный'])
+
+    def test_backfill_command(self):
+        """backfill_feeds восстанавливает потерянные записи ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='пост', author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feeds', stdout=StringIO())
+        self.assertEqual(self.feed_texts(), ['пост'])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=3,
+                       FEED_FANOUT_RESUME_FOLLOWERS=2)
+    def test_pull_mode_hysteresis(self):
+        """у порога отписка не переключает автора, догоняет команда"""
+        fans = [User.objects.create(username=f'fan{i}') for i in range(3)]
+        for fan in [self.reader, *fans]:
+            Follow.objects.create(user=fan, author=self.star)
+        self.assertIn(self.star.pk, feed.get_pull_authors())
+        # режим хранится в профиле и не теряется вместе с кэшем
+        cache.clear()
+        self.assertTrue(feed.is_pull_author(self.star.pk))
+        Post.objects.create(text='в режиме чтения', author=self.star)
+        for fan in fans[:2]:
+            Follow.objects.filter(user=fan, author=self.star).delete()
+        # подписчиков меньше верхнего порога, но не меньше нижнего
+        call_command('backfill_feeds', '--resume', stdout=StringIO())
+        self.assertIn(self.star.pk, feed.get_pull_authors())
+        Follow.objects.filter(user=fans[2], author=self.star).delete()
+        # отписка сама ленты не догоняет
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_texts(), ['в режиме чтения'])
+        call_command('backfill_feeds', '--resume', stdout=StringIO())
+        self.assertNotIn(self.star.pk, feed.get_pull_authors())
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user__username', flat=True)),
+            ['reader'],
+        )
+        self.assertEqual(self.feed_texts(), ['в режиме чтения'])
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_rebuild_keeps_latest_posts(self):
+        """пересборка берёт у автора только последние посты"""
+        for text in ('первый', 'второй', 'третий'):
+            Post.objects.create(text=text, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        feed.rebuild_feeds([self.reader.pk, self.author.pk])
+        self.assertEqual(self.feed_texts(), ['третий', 'второй'])
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import versions
+from posts.follow_cache import FollowingCache, following
+from posts.models import Follow, User
+from posts.tests.utils import on_commit_callbacks
+from yatube.cache import SharedFileCache
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.other = User.objects.create(username='other')
+        Follow.objects.create(user=cls.reader, author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        following.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        # догонка ленты (INSERT INTO posts_feedentry ... FROM
+        # posts_follow) к самим подпискам не относится
+        return [query['sql'] for query in queries
+                if 'posts_follow' in query['sql']
+                and 'posts_feedentry' not in query['sql']]
+
+    def test_check_costs_nothing_once_loaded(self):
+        """«подписан ли» читается из памяти после первой загрузки"""
+        url = reverse('profile', args=['other'])
+        self.assertEqual(len(self.follow_queries(url)), 1)
+        self.assertEqual(self.follow_queries(url + '?cursor=x'), [])
+        self.assertEqual(following.authors(self.reader.pk),
+                         {self.other.pk})
+
+    def test_follow_is_one_insert(self):
+        """подписка — одна запись, повторная упирается в индекс"""
+        follow_url = reverse('profile_follow', args=['author'])
+        following.authors(self.reader.pk)
+        with on_commit_callbacks():
+            queries = self.follow_queries(follow_url)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('INSERT'))
+        # сигнал подписки обновил множество на месте
+        self.assertEqual(following.authors(self.reader.pk),
+                         {self.other.pk, self.author.pk})
+        self.client.get(follow_url)
+        self.assertEqual(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).count(), 1)
+        unfollow_url = reverse('profile_unfollow', args=['author'])
+        with on_commit_callbacks():
+            self.assertIn('DELETE', self.follow_queries(unfollow_url)[-1])
+        self.assertNotIn('DELETE', ' '.join(
+            self.follow_queries(unfollow_url)
+        ))
+        self.assertEqual(following.authors(self.reader.pk),
+                         {self.other.pk})
+
+    def test_stale_cache_does_not_block_writes(self):
+        """устаревшее множество не мешает ни подписке, ни отписке"""
+        following.authors(self.reader.pk)
+        Follow.objects.create(user=self.reader, author=self.author)
+        # множество процесса отстало от базы
+        following.changed(self.reader.pk, self.author.pk, False)
+        self.assertFalse(
+            following.is_following(self.reader, self.author.pk)
+        )
+        self.client.get(reverse('profile_unfollow', args=['author']))
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        following.changed(self.reader.pk, self.author.pk, True)
+        self.client.get(reverse('profile_follow', args=['author']))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+    @override_settings(
+        CACHES={'default': settings.CACHE_BACKENDS['shared']}
+    )
+    def test_other_process_sees_change(self):
+        """подписка в другом процессе сдвигает метку в общем кэше,
+        и множество перечитывается"""
+        location = settings.CACHES['default']['LOCATION']
+        # у «другого процесса» свой объект кэша на том же файле
+        other_cache = SharedFileCache(location, {})
+        process = FollowingCache(10)
+        with mock.patch.object(versions, 'cache', other_cache):
+            self.assertEqual(process.authors(self.reader.pk),
+                             {self.other.pk})
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(versions, 'cache', other_cache):
+            self.assertEqual(process.authors(self.reader.pk),
+                             {self.other.pk, self.author.pk})
+
+    def test_rolled_back_follow_keeps_set(self):
+        """откаченная подписка не попадает в множество процесса"""
+        following.authors(self.reader.pk)
+        with on_commit_callbacks():
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    Follow.objects.create(
+                        user=self.reader, author=self.author
+                    )
+                    raise DatabaseError
+        self.assertEqual(following.authors(self.reader.pk),
+                         {self.other.pk})
+
+    def test_lru_bound(self):
+        process = FollowingCache(2)
+        for user in (self.reader, self.author, self.other):
+            process.authors(user.pk)
+        process.authors(self.other.pk)
+        self.assertEqual(list(process._entries),
+                         [self.author.pk, self.other.pk])
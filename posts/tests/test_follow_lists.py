@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.follow_cache import following
+from posts.models import Follow, User
+
+
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = User.objects.create(username='star')
+        cls.reader = User.objects.create(username='reader')
+        cls.fans = [User.objects.create(username=f'fan{i}') for i in range(5)]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.star)
+        # читатель подписан на двух поклонников и на саму звезду
+        for user in (cls.fans[1], cls.fans[3], cls.star):
+            Follow.objects.create(user=cls.reader, author=user)
+
+    def setUp(self):
+        cache.clear()
+        following.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def listed(self, response):
+        return [(user.username, user.you_follow)
+                for user in response.context['page']]
+
+    @override_settings(PAGINATOR_PAGE_SIZE=3)
+    def test_followers_newest_first_with_flags(self):
+        """подписчики по курсору, свежие сверху, с отметкой «вы подписаны»"""
+        url = reverse('followers', args=['star'])
+        response = self.client.get(url)
+        self.assertEqual(self.listed(response), [
+            ('reader', False), ('fan4', False), ('fan3', True),
+        ])
+        self.assertContains(response, 'вы подписаны', count=1)
+        response = self.client.get(
+            url, {'cursor': response.context['page'].next_cursor}
+        )
+        self.assertEqual(self.listed(response), [
+            ('fan2', False), ('fan1', True), ('fan0', False),
+        ])
+        self.assertFalse(response.context['page'].has_next())
+
+    def test_following(self):
+        response = Client().get(reverse('following', args=['reader']))
+        self.assertEqual(self.listed(response), [
+            ('star', False), ('fan3', False), ('fan1', False),
+        ])
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """пользователи с профилями — тем же запросом, отметки — из
+        множества подписок читателя"""
+        url = reverse('followers', args=['star'])
+        counts = []
+        for size in (2, 6):
+            cache.clear()
+            following.clear()
+            with override_settings(PAGINATOR_PAGE_SIZE=size):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[0], 5)
+
+    def test_user_card_links(self):
+        response = self.client.get(reverse('profile', args=['star']))
+        self.assertContains(response, reverse('followers', args=['star']))
+        self.assertContains(response, reverse('following', args=['star']))
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Comment, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class HttpCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='группа', slug='group')
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_anonymous_pages_are_public(self):
+        """анонимную ленту может кэшировать CDN, браузер сверяет ETag"""
+        response = self.client.get(reverse('index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=', response['Cache-Control'])
+        self.assertIn('max-age=0', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+    def test_authenticated_pages_are_private(self):
+        """страница вошедшего пользователя не попадает в общий кэш"""
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('index'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        # у другого пользователя своя версия страницы
+        other = Client()
+        other.force_login(User.objects.create(username='other'))
+        self.assertEqual(other.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 200)
+
+    def test_validators_follow_changes(self):
+        """новый комментарий и пост в группе меняют ETag своих страниц"""
+        post_url = reverse('post', args=['author', self.post.pk])
+        group_url = reverse('group_posts', args=['group'])
+        post_etag = self.client.get(post_url)['ETag']
+        group_etag = self.client.get(group_url)['ETag']
+        self.assertEqual(self.client.get(
+            post_url, HTTP_IF_NONE_MATCH=post_etag
+        ).status_code, 304)
+
+        with on_commit_callbacks():
+            Comment.objects.create(
+                post=self.post, author=self.author, text='к'
+            )
+        self.assertEqual(self.client.get(
+            post_url, HTTP_IF_NONE_MATCH=post_etag
+        ).status_code, 200)
+        self.assertEqual(self.client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag
+        ).status_code, 200)
+        group_etag = self.client.get(group_url)['ETag']
+        with on_commit_callbacks():
+            Post.objects.create(text='вне группы', author=self.author)
+        self.assertEqual(self.client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag
+        ).status_code, 304)
+
+    @override_settings(
+        CACHES={'default': settings.CACHE_BACKENDS['locmem']}
+    )
+    def test_no_validators_with_process_local_cache(self):
+        """без общего кэша метки не сверяются и 304 по ним не бывает"""
+        urls = (
+            reverse('index'), reverse('api:index'),
+            reverse('profile', args=['author']),
+            reverse('post', args=['author', self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                # ETag остаётся только от ConditionalGetMiddleware,
+                # по содержимому ответа
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertNotIn(
+                    's-maxage', response.get('Cache-Control', '')
+                )
+                self.assertEqual(self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date()
+                ).status_code, 200)
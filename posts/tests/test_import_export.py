@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import search
+from posts.models import (Comment, FeedEntry, Follow, Group, Post,
+                          PostSearch, User)
+
+
+class ImportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        group = Group.objects.create(
+            title='Коты', slug='cats', description='о котах'
+        )
+        cls.date = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+        first = Post.objects.create(
+            text='Кошки гуляли по крыше', author=cls.author, group=group
+        )
+        second = Post.objects.create(text='Второй пост', author=cls.reader)
+        Post.objects.filter(pk=first.pk).update(pub_date=cls.date)
+        for text in ('первый', 'второй'):
+            Comment.objects.create(post=first, author=cls.reader, text=text)
+        Comment.objects.create(post=second, author=cls.author, text='сам')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        out = StringIO()
+        call_command('export_content', stdout=out)
+        self.lines = out.getvalue().splitlines()
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'content.jsonl')
+        with open(self.path, 'w', encoding='utf-8') as dump:
+            dump.write(out.getvalue())
+        self.addCleanup(os.remove, self.path)
+
+    def test_export_is_jsonl_in_dependency_order(self):
+        """по объекту на строку: группы, посты, комментарии, подписки"""
+        models = [json.loads(line)['model'] for line in self.lines]
+        self.assertEqual(models, [
+            'posts.group', 'posts.post', 'posts.post', 'posts.comment',
+            'posts.comment', 'posts.comment', 'posts.follow',
+        ])
+        self.assertEqual(json.loads(self.lines[-1]), {
+            'model': 'posts.follow', 'user': 'reader', 'author': 'author',
+        })
+
+    def test_round_trip(self):
+        """выгрузка, очистка и загрузка восстанавливают содержимое,
+        счётчики, ленты и поиск"""
+        for model in (Follow, Group, Post):
+            model.objects.all().delete()
+        # по одному пользователю в IN (...), чтобы пройти все порции
+        with mock.patch(
+                'posts.management.commands.import_content.CHUNK', 1):
+            call_command('import_content', self.path, batch=2,
+                         stdout=StringIO())
+        post = Post.objects.get(text='Кошки гуляли по крыше')
+        self.assertEqual(post.pub_date, self.date)
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            sorted(post.comments.values_list('text', flat=True)),
+            ['второй', 'первый'],
+        )
+        self.assertEqual(
+            Post.objects.get(text='Второй пост').comments.get().text, 'сам'
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        profile = User.objects.get(username='author').profile
+        self.assertEqual(
+            (profile.posts_count, profile.followers_count), (1, 1)
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        found = PostSearch.objects.filter(
+            text__match=search.build_query('кошки')
+        ).values_list('post_id', flat=True)
+        self.assertEqual(list(found), [post.pk])
+
+    def test_missing_users(self):
+        """неизвестные авторы — ошибка, с --create-users — новые
+        пользователи без пароля"""
+        User.objects.filter(username='author').delete()
+        with self.assertRaisesMessage(CommandError, 'author'):
+            call_command('import_content', self.path, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username='author').exists())
+        call_command('import_content', self.path, create_users=True,
+                     stdout=StringIO())
+        author = User.objects.get(username='author')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(author.profile.posts_count, 1)
+
+    def test_missing_group(self):
+        """пост неизвестной группы — ошибка с номером строки"""
+        lines = [line for line in self.lines
+                 if json.loads(line)['model'] != 'posts.group']
+        with open(self.path, 'w', encoding='utf-8') as dump:
+            dump.write('\n'.join(lines))
+        Group.objects.all().delete()
+        number = next(
+            number for number, line in enumerate(lines, 1)
+            if json.loads(line).get('group') == 'cats'
+        )
+        with self.assertRaisesMessage(
+                CommandError, f'Строка {number}: нет группы cats'):
+            call_command('import_content', self.path, stdout=StringIO())
@@ -0,0 +1,89 @@
+import os
+import re
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube import metrics
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        Post.objects.create(text='пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def sample(self, text, line):
+        match = re.search('^' + re.escape(line) + r' (\S+)$', text, re.M)
+        return float(match.group(1)) if match else 0.0
+
+    def test_request_recorded_per_view(self):
+        """запрос к ленте виден в /metrics с числом SQL и временем"""
+        before = self.client.get(reverse('metrics')).content.decode()
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        requests = ('yatube_requests_total'
+                    '{method="GET",status="200",view="index"}')
+        self.assertEqual(
+            self.sample(text, requests) - self.sample(before, requests), 2
+        )
+        queries = 'yatube_db_queries_total{view="index"}'
+        self.assertGreater(
+            self.sample(text, queries), self.sample(before, queries)
+        )
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertGreaterEqual(self.sample(
+            text,
+            'yatube_request_duration_seconds_bucket{view="index",le="+Inf"}'
+        ), 2)
+        self.assertGreater(self.sample(
+            text, 'yatube_template_render_seconds_total{view="index"}'
+        ), 0)
+        # вторая страница пришла из кэша страниц
+        self.assertGreater(
+            self.sample(text, 'yatube_cache_hits_total{view="index"}'), 0
+        )
+
+    def test_foreign_address_forbidden(self):
+        """читать метрики можно только с разрешённых адресов"""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class RegistryTests(TestCase):
+    def test_processes_share_file(self):
+        """приращения разных процессов складываются в общем файле"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.sqlite3')
+            first, second = metrics.Registry(path), metrics.Registry(path)
+            first.inc('yatube_db_queries_total', {'view': 'index'}, 3)
+            second.inc('yatube_db_queries_total', {'view': 'index'}, 4)
+            second.observe(
+                'yatube_request_duration_seconds', {'view': 'index'},
+                0.2, (0.1, 0.25, 1),
+            )
+            first.flush()
+            text = metrics.render(second.collect())
+        self.assertIn('yatube_db_queries_total{view="index"} 7.0', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="index",le="0.1"} 0', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="index",le="0.25"} 1.0', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 1.0', text
+        )
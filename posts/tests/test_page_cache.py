@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import page_cache
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='группа', slug='group')
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url, **params):
+        return self.client.get(url, params)['X-Page-Cache']
+
+    def test_second_request_served_from_cache(self):
+        """повторная анонимная страница не обращается к базе"""
+        url = reverse('group_posts', args=['group'])
+        self.assertEqual(self.get(url), 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(url), 'HIT')
+        self.assertEqual(len(queries), 0)
+        # другая строка запроса — другая запись
+        self.assertEqual(self.get(url, cursor='x'), 'MISS')
+        self.assertEqual(
+            page_cache.stats(), {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3}
+        )
+        out = StringIO()
+        call_command('page_cache_stats', stdout=out)
+        self.assertIn('доля попаданий: 33.3%', out.getvalue())
+
+    def test_changes_invalidate_affected_pages(self):
+        """комментарий сбрасывает страницы поста, но не чужие ленты"""
+        post_url = reverse('post', args=['author', self.post.pk])
+        urls = {
+            reverse('index'): 'MISS',
+            reverse('group_posts', args=['group']): 'MISS',
+            reverse('profile', args=['author']): 'MISS',
+            reverse('profile', args=['reader']): 'HIT',
+            post_url: 'MISS',
+        }
+        for url in urls:
+            self.get(url)
+        self.get(post_url, cursor='x')
+        with on_commit_callbacks():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='к'
+            )
+            # до COMMIT поколения не сдвинуты: читатель, попавший
+            # между записью и COMMIT, не закэширует старую страницу
+            # под новым ключом
+            self.assertEqual(self.get(post_url), 'HIT')
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url), expected)
+        self.assertEqual(self.get(post_url, cursor='x'), 'MISS')
+
+    def test_follow_and_group_edit(self):
+        """подписка сбрасывает профили обоих, правка группы — все страницы"""
+        author_url = reverse('profile', args=['author'])
+        index_url = reverse('index')
+        self.get(author_url)
+        self.get(index_url)
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get(author_url), 'MISS')
+        self.assertEqual(self.get(index_url), 'HIT')
+        self.group.title = 'новое название'
+        with on_commit_callbacks():
+            self.group.save()
+        response = self.client.get(index_url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'новое название')
+
+    def test_group_delete(self):
+        """удаление группы сбрасывает страницы и фрагменты её постов"""
+        index_url = reverse('index')
+        post_url = reverse('post', args=['author', self.post.pk])
+        group_url = reverse('group_posts', args=['group'])
+        self.assertContains(self.client.get(index_url), group_url)
+        self.get(post_url)
+        with on_commit_callbacks():
+            self.group.delete()
+        for url in (index_url, post_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'MISS')
+                self.assertNotContains(response, group_url)
+
+    def test_authenticated_not_cached(self):
+        """вошедшему пользователю страницы рисуются заново"""
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    @override_settings(
+        CACHES={'default': settings.CACHE_BACKENDS['locmem']}
+    )
+    def test_disabled_with_process_local_cache(self):
+        """с кэшем, своим у каждого процесса, страницы не кэшируются"""
+        response = Client().get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Page-Cache'))
@@ -0,0 +1,59 @@
+import datetime as dt
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.paginator import CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='testa')
+        posts = Post.objects.bulk_create(
+            Post(text=f'пост {i}', author=cls.user) for i in range(25)
+        )
+        # у части постов одинаковая дата, порядок решает id
+        same_date = timezone.now() - dt.timedelta(days=1)
+        Post.objects.filter(
+            id__in=[post.id for post in posts[:5]]
+        ).update(pub_date=same_date)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def test_walk_forward_and_back(self):
+        """курсоры проходят ленту целиком в обе стороны без повторов"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page()
+        seen = list(page)
+        self.assertFalse(page.has_previous())
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), 5)
+        page = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(page), self.expected[10:20])
+        page = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(page), self.expected[:10])
+        self.assertFalse(page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """битый курсор отдаёт первую страницу"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        for cursor in ('мусор', 'WyJ4Il0', 'WyJuIiwgWzEsIDIsIDNdXQ'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), self.expected[:10])
+
+    def test_index_uses_cursor(self):
+        """index переходит на следующую страницу по курсору"""
+        client = Client()
+        response = client.get(reverse('index'))
+        page = response.context['page']
+        response = client.get(reverse('index'), {'cursor': page.next_cursor})
+        self.assertEqual(
+            list(response.context['page']), self.expected[10:20]
+        )
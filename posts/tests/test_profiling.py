@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post
+from yatube.profiling import SamplingProfilerMiddleware
+
+PROFILER_DIR = tempfile.mkdtemp()
+
+
+def slow_view(request):
+    Post.objects.count()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return HttpResponse('ok')
+
+
+@override_settings(
+    PROFILER_ENABLED=True, PROFILER_DIR=PROFILER_DIR,
+    PROFILER_SLOW_SECONDS=0.03, PROFILER_INTERVAL=0.001,
+    PROFILER_SAMPLE_EVERY=0,
+)
+class ProfilerTests(TestCase):
+    def tearDown(self):
+        shutil.rmtree(PROFILER_DIR, ignore_errors=True)
+
+    def test_disabled_profiler_leaves_chain(self):
+        """выключенный профилировщик не добавляет накладных расходов"""
+        with self.settings(PROFILER_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                SamplingProfilerMiddleware(slow_view)
+
+    def test_slow_request_written(self):
+        """медленный запрос оставляет стеки и свои SQL-запросы"""
+        middleware = SamplingProfilerMiddleware(slow_view)
+        middleware(RequestFactory().get('/slow/'))
+        files = sorted(os.listdir(PROFILER_DIR))
+        self.assertEqual(len(files), 2)
+        collapsed, sql = (os.path.join(PROFILER_DIR, name) for name in files)
+        with open(collapsed) as stacks:
+            self.assertIn('slow_view (', stacks.read())
+        with open(sql) as queries:
+            self.assertIn('COUNT(*)', queries.read())
+
+    def test_fast_request_skipped_unless_sampled(self):
+        """быстрые запросы пишутся только каждый N-й"""
+        middleware = SamplingProfilerMiddleware(lambda r: HttpResponse())
+        middleware(RequestFactory().get('/'))
+        self.assertFalse(os.path.exists(PROFILER_DIR)
+                         and os.listdir(PROFILER_DIR))
+        with self.settings(PROFILER_SAMPLE_EVERY=2):
+            middleware(RequestFactory().get('/'))
+            middleware(RequestFactory().get('/'))
+        self.assertEqual(len(os.listdir(PROFILER_DIR)), 2)
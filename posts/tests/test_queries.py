@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов на страницу не зависит от количества постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            author = User.objects.create(username=f'user{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=f'пост {i}', author=author, group=cls.group
+            )
+            Comment.objects.create(post=post, author=cls.reader, text='к')
+            Post.objects.create(text=f'ещё {i}', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self, url, page_size):
+        with override_settings(PAGINATOR_PAGE_SIZE=page_size):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(len(response.context['page']), page_size)
+        return len(queries)
+
+    def test_fixed_query_count(self):
+        """select_related в for_feed убирает N+1 на всех лентах"""
+        urls = {
+            reverse('index'): 3,
+            reverse('group_posts', kwargs={'slug': 'group'}): 4,
+            reverse('profile', kwargs={'username': 'author'}): 5,
+            reverse('follow_index'): 4,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url, 2), expected)
+                self.assertEqual(self.count_queries(url, 10), expected)
+
+    def test_post_view_comments_paginated(self):
+        """комментарии поста листаются курсором и не дают N+1"""
+        post = Post.objects.filter(author__username='user0').get()
+        for i in range(5):
+            author = User.objects.create(username=f'commenter{i}')
+            Comment.objects.create(post=post, author=author, text=f'к{i}')
+        url = reverse('post', kwargs={'username': 'user0', 'post_id': post.pk})
+        with override_settings(COMMENTS_PAGE_SIZE=4):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            page = response.context['comments_page']
+            self.assertEqual(len(page), 4)
+            # пост с автором и профилем, комментарии с авторами
+            # и сессия с пользователем
+            self.assertEqual(len(queries), 4)
+            response = self.client.get(url, {'cursor': page.next_cursor})
+        texts = [c.text for c in response.context['comments_page']]
+        self.assertEqual(texts, ['к3', 'к4'])
+
+    def test_query_plans_use_indexes(self):
+        """check_query_plans не находит полных просмотров таблиц"""
+        out = StringIO()
+        call_command('check_query_plans', '--verbose-plans', stdout=out)
+        self.assertIn('post_date_idx', out.getvalue())
@@ -0,0 +1,111 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+from yatube.db import routers
+from yatube.db.routers import ReplicaRouter
+
+original_db_for_read = ReplicaRouter.db_for_read
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='группа', slug='group')
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reads = []
+        # реплики в тестах нет: решение роутера записывается,
+        # а запрос всё равно идёт в тестовую базу
+        router = mock.patch.object(
+            ReplicaRouter, 'db_for_read', autospec=True,
+            side_effect=self.record,
+        )
+        router.start()
+        self.addCleanup(router.stop)
+        # метки лент свежие (кэш очищен), а отставание считаем
+        # от «через минуту»
+        clock = mock.patch('yatube.db.routers.time')
+        clock.start().time.return_value = time.time() + 60
+        self.addCleanup(clock.stop)
+
+    def record(self, router, model, **hints):
+        alias = original_db_for_read(router, model, **hints)
+        self.reads.append((model._meta.label, alias))
+        return 'default'
+
+    def clock_now(self, now):
+        routers.time.time.return_value = now
+
+    def aliases(self, label):
+        return {alias for model, alias in self.reads
+                if model == label or model.startswith(label + '.')}
+
+    def test_feeds_read_from_replica(self):
+        """ленты читают посты с реплики, пользователя — с основной"""
+        client = Client()
+        client.force_login(self.reader)
+        for url in (reverse('index'),
+                    reverse('group_posts', args=['group']),
+                    reverse('profile', args=['author']),
+                    reverse('post', args=['author', self.post.pk]),
+                    reverse('follow_index')):
+            self.reads.clear()
+            self.assertEqual(client.get(url).status_code, 200)
+            self.assertIn('replica', self.aliases('posts'), url)
+            self.assertEqual(self.aliases('auth.User') - {'default'},
+                             set(), url)
+            self.assertEqual(self.aliases('sessions.Session'),
+                             {'default'}, url)
+
+    def test_writer_pinned_to_primary(self):
+        """после своей записи пользователь читает основную базу"""
+        client = Client()
+        client.force_login(self.reader)
+        post_url = reverse('post', args=['author', self.post.pk])
+        response = client.post(
+            reverse('add_comment', args=['author', self.post.pk]),
+            {'text': 'мой комментарий'},
+        )
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_LAG_SECONDS)
+        self.reads.clear()
+        response = client.get(post_url)
+        self.assertContains(response, 'мой комментарий')
+        self.assertEqual(
+            {alias for model, alias in self.reads}, {'default'}
+        )
+        # другие читатели по-прежнему идут на реплику
+        self.reads.clear()
+        Client().get(post_url)
+        self.assertIn('replica', self.aliases('posts.Post'))
+
+    def test_recent_change_read_from_primary(self):
+        """страница, изменившаяся позже отставания реплики, — из основной"""
+        self.clock_now(time.time())
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        self.reads.clear()
+        Client().get(reverse('post', args=['author', self.post.pk]))
+        self.assertEqual(self.aliases('posts.Post'), {'replica', 'default'})
+        # после переключения пост перечитан из основной базы
+        self.assertEqual(self.reads[-1][1], 'default')
+        self.assertNotIn('replica', {alias for _, alias in self.reads[1:]})
+
+    def test_writes_and_transactions_use_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(original_db_for_read(router, Post), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
@@ -0,0 +1,74 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='writer')
+        cls.cats = Post.objects.create(
+            text='Кошки гуляли по крыше', author=cls.author
+        )
+        cls.tree = Post.objects.create(
+            text='Ёлка <b>горит</b> огнями', author=cls.author
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки лаяли на кошку, кошка убежала', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        return response, [post.pk for post in response.context['page']]
+
+    def test_stemmed_and_ranked(self):
+        """другая форма слова находится, пост с двумя совпадениями выше"""
+        response, found = self.found('кошками')
+        self.assertEqual(found, [self.dogs.pk, self.cats.pk])
+        self.assertContains(response, '<mark>Кошки</mark> гуляли')
+
+    def test_index_follows_edits_and_deletes(self):
+        """триггеры обновляют индекс при правке и удалении поста"""
+        post = Post.objects.get(pk=self.cats.pk)
+        post.text = 'Коты спят'
+        post.save()
+        self.assertEqual(self.found('коты')[1], [self.cats.pk])
+        self.assertEqual(self.found('гуляли')[1], [])
+        Post.objects.filter(pk=self.dogs.pk).delete()
+        self.assertEqual(self.found('кошка')[1], [])
+
+    def test_snippet_escaped_and_yo_folded(self):
+        """«ё» ищется как «е», HTML из текста поста экранируется"""
+        response, found = self.found('елки')
+        self.assertEqual(found, [self.tree.pk])
+        self.assertContains(response, '&lt;b&gt;горит&lt;/b&gt;')
+
+    def test_query_syntax_is_not_passed_through(self):
+        """операторы FTS5 во вводе не ломают запрос"""
+        self.assertEqual(
+            search.build_query('кошка OR "NEAR(*'), '"кошк"* "or" "near"*'
+        )
+        self.assertEqual(self.found('"*(')[1], [])
+
+    def test_cursor_pagination(self):
+        """курсор по рангу листает результаты без пропусков"""
+        posts = [
+            Post.objects.create(text=f'рыба номер {i}', author=self.author)
+            for i in range(12)
+        ]
+        with self.settings(PAGINATOR_PAGE_SIZE=5):
+            seen = []
+            response, found = self.found('рыбы')
+            seen += found
+            while response.context['page'].has_next():
+                response, found = self.found(
+                    'рыбы', cursor=response.context['page'].next_cursor
+                )
+                seen += found
+        self.assertEqual(sorted(seen), sorted(post.pk for post in posts))
+        self.assertEqual(len(seen), len(set(seen)))
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import suggestions
+from posts.follow_cache import following
+from posts.models import Follow, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        names = ('reader', 'a', 'b', 'c', 'd', 'e', 'x', 'y', 'newbie')
+        cls.users = {name: User.objects.create(username=name)
+                     for name in names}
+        for user, author in (
+                ('reader', 'a'), ('reader', 'b'),
+                ('a', 'c'), ('b', 'c'), ('b', 'd'),
+                ('x', 'a'), ('x', 'e'), ('y', 'a'), ('y', 'e')):
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+
+    def setUp(self):
+        cache.clear()
+        following.clear()
+
+    def pk(self, name):
+        return self.users[name].pk
+
+    def test_graph(self):
+        """друзья друзей весят больше совместных подписок"""
+        graph = suggestions.Graph(fanout=10, sample=10, related_count=5)
+        self.assertEqual(
+            list(graph.following[self.pk('b')]),
+            sorted([self.pk('c'), self.pk('d')], reverse=True),
+        )
+        self.assertEqual(graph.following[graph.size + 5], ())
+        self.assertIn(self.pk('e'), graph.related[self.pk('a')])
+        self.assertEqual(
+            graph.suggest(self.pk('reader'), 3),
+            [self.pk('c'), self.pk('d'), self.pk('e')],
+        )
+
+    def test_fanout_keeps_latest(self):
+        """у читателя учитываются только самые свежие подписки"""
+        graph = suggestions.Graph(fanout=1, sample=10, related_count=5)
+        self.assertEqual(list(graph.following[self.pk('reader')]),
+                         [self.pk('b')])
+
+    def test_command_fills_blocks(self):
+        """команда раскладывает списки, страницы показывают блоки"""
+        call_command('suggest_authors', stdout=StringIO())
+        client = Client()
+        client.force_login(self.users['reader'])
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(
+            [user.username for user in response.context['suggestions']],
+            ['c', 'd', 'e'],
+        )
+        self.assertContains(response, 'Кого почитать')
+        # только что оформленная подписка отфильтровывается сразу
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.users['reader'],
+                                  author=self.users['c'])
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(
+            [user.username for user in response.context['suggestions']],
+            ['d', 'e'],
+        )
+        response = client.get(reverse('profile', args=['a']))
+        self.assertIn(self.users['e'], response.context['suggestions'])
+        self.assertNotIn(self.users['a'], response.context['suggestions'])
+
+    def test_newbie_gets_popular(self):
+        """без подписок предлагаются самые читаемые авторы"""
+        call_command('suggest_authors', stdout=StringIO())
+        client = Client()
+        client.force_login(self.users['newbie'])
+        response = client.get(reverse('follow_index'))
+        names = [user.username for user in response.context['suggestions']]
+        self.assertEqual(names[:2], ['a', 'c'])
+        self.assertNotIn('newbie', names)
+
+    def test_command_refreshes_cached_pages(self):
+        """после пересчёта гость видит новый блок, ETag меняется"""
+        url = reverse('profile', args=['a'])
+        anonymous = Client()
+        self.assertNotContains(anonymous.get(url), 'С этим автором читают')
+        client = Client()
+        client.force_login(self.users['reader'])
+        etag = client.get(url)['ETag']
+        call_command('suggest_authors', stdout=StringIO())
+        response = anonymous.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'С этим автором читают')
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
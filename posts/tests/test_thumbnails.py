@@ -0,0 +1,177 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import image_variants, thumbnails
+from posts.models import Post, ThumbnailJob, User
+from posts.tests.utils import on_commit_callbacks
+
+
+def make_image(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+class ThumbnailQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # картинки — во временном каталоге системы, а не в репозитории
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testa')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_thumbnail_generated_off_request(self):
+        """миниатюра ставится в очередь и режется воркером, а не запросом"""
+        self.client.post(reverse('new_post'), {
+            'text': 'с картинкой', 'image': make_image(),
+        })
+        post = Post.objects.get()
+        self.assertTrue(ThumbnailJob.objects.filter(
+            image=post.image.name, geometry='960x339'
+        ).exists())
+        # пока миниатюры нет, страница отдаёт оригинал
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, post.image.url)
+        etag = response['ETag']
+        anonymous = Client()
+        post_url = reverse('post', args=['testa', post.pk])
+        self.assertContains(anonymous.get(post_url), post.image.url)
+
+        call_command(
+            'thumbnail_worker', once=True, processes=1, stdout=StringIO()
+        )
+        self.assertFalse(ThumbnailJob.objects.exists())
+        response = self.client.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, post.image.url)
+        self.assertContains(response, '<picture>')
+        # кэш страниц для гостей тоже сброшен
+        response = anonymous.get(post_url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertNotContains(response, post.image.url)
+
+    def test_picture_rendered_from_stored_variants(self):
+        """<picture> и srcset строятся из Post.image_variants без sorl"""
+        post = Post.objects.create(
+            text='пост', author=self.user, image=make_image()
+        )
+        call_command(
+            'prewarm_thumbnails', run=True, processes=1, stdout=StringIO()
+        )
+        post.refresh_from_db()
+        widths = [width for width, height, path in post.variants['formats'][
+            'webp']]
+        self.assertEqual(widths, [320, 640, 960, 1200])
+        self.assertEqual(post.variants['height'], 424)
+        with mock.patch('sorl.thumbnail.default.kvstore') as kvstore:
+            response = self.client.get(reverse('index'))
+        kvstore.get.assert_not_called()
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '_640.webp 640w')
+        self.assertContains(response, '_1200.jpg 1200w')
+
+    def test_old_variant_files_removed(self):
+        """повторная нарезка, смена картинки и удаление поста убирают
+        файлы прежних вариантов"""
+        post = Post.objects.create(
+            text='пост', author=self.user, image=make_image()
+        )
+
+        def stored_paths():
+            post.refresh_from_db()
+            paths = image_variants.variant_paths(post.image_variants)
+            self.assertTrue(paths)
+            return paths
+
+        image_variants.store_variants(post.image.name)
+        first = stored_paths()
+        image_variants.store_variants(post.image.name)
+        second = stored_paths()
+        self.assertFalse(first & second)
+        for path in first:
+            self.assertFalse(default_storage.exists(path))
+        for path in second:
+            self.assertTrue(default_storage.exists(path))
+
+        with on_commit_callbacks():
+            post.image = make_image('other.jpg')
+            post.image_variants = ''
+            post.save()
+        for path in second:
+            self.assertFalse(default_storage.exists(path))
+        image_variants.store_variants(post.image.name)
+        third = stored_paths()
+        with on_commit_callbacks():
+            post.delete()
+        for path in third:
+            self.assertFalse(default_storage.exists(path))
+
+    def test_prewarm_enqueues_existing_images(self):
+        """prewarm_thumbnails ставит в очередь картинки старых постов"""
+        post = Post.objects.create(
+            text='старый', author=self.user, image=make_image()
+        )
+        ThumbnailJob.objects.all().delete()
+        call_command('prewarm_thumbnails', stdout=StringIO())
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=post.image.name).exists()
+        )
+
+    @override_settings(THUMBNAIL_JOB_ATTEMPTS=2)
+    def test_failed_job_is_requeued(self):
+        """неудачная нарезка возвращает задачу в очередь до лимита попыток"""
+        ThumbnailJob.objects.create(image='photo.jpg', geometry='10x10')
+        with mock.patch.object(default.backend, 'get_thumbnail',
+                               side_effect=OSError):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                jobs = thumbnails.claim_jobs(10)
+                # задача в аренде: второй воркер её не получит
+                self.assertEqual(thumbnails.claim_jobs(10), [])
+                self.assertEqual(thumbnails.run_jobs(jobs), 0)
+            job = ThumbnailJob.objects.get()
+            self.assertEqual(job.attempts, 1)
+            self.assertIsNone(job.leased_until)
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                thumbnails.run_jobs(thumbnails.claim_jobs(10))
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_expired_lease_is_reclaimed(self):
+        """задачу упавшего воркера забирает следующий"""
+        job = ThumbnailJob.objects.create(image='photo.jpg', geometry='1x1')
+        thumbnails.claim_jobs(10)
+        self.assertEqual(thumbnails.claim_jobs(10), [])
+        ThumbnailJob.objects.update(
+            leased_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(
+            [job_id for job_id, *rest in thumbnails.claim_jobs(10)],
+            [job.pk],
+        )
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import trending
+from posts.models import (Comment, Follow, Group, Post, TrendingGroup,
+                          TrendingPost, User)
+
+
+@override_settings(TRENDING_HALF_LIFE=100, TRENDING_MIN_SCORE=0.6)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = User.objects.create(username='star')
+        cls.nobody = User.objects.create(username='nobody')
+        cls.reader = User.objects.create(username='reader')
+        for name in ('a', 'b', 'c'):
+            Follow.objects.create(
+                user=User.objects.create(username=name), author=cls.star
+            )
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy')
+        cls.star_post = Post.objects.create(
+            author=cls.star, text='звезда', group=cls.quiet
+        )
+        cls.plain_post = Post.objects.create(
+            author=cls.nobody, text='обычный', group=cls.busy
+        )
+        Post.objects.create(author=cls.nobody, text='ещё', group=cls.busy)
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post):
+        Comment.objects.create(post=post, author=self.reader, text='!')
+
+    def score(self, post):
+        return TrendingPost.objects.get(post=post).score
+
+    def test_comments_heat_posts(self):
+        """комментарий греет пост, у автора с подписчиками — сильнее"""
+        self.comment(self.plain_post)
+        self.comment(self.star_post)
+        self.assertAlmostEqual(self.score(self.plain_post), 1)
+        self.assertGreater(self.score(self.star_post), 2)
+        self.comment(self.plain_post)
+        self.assertAlmostEqual(self.score(self.plain_post), 2)
+
+    def test_decay(self):
+        """за период полураспада значения вдвое меньше, остывшие
+        строки удаляются"""
+        self.comment(self.plain_post)
+        self.comment(self.plain_post)
+        self.comment(self.star_post)
+        star = self.score(self.star_post)
+        trending.decay(now=1000)
+        trending.decay(now=1100)
+        self.assertAlmostEqual(self.score(self.plain_post), 1)
+        self.assertAlmostEqual(self.score(self.star_post), star / 2)
+        trending.decay(now=1200)
+        self.assertFalse(
+            TrendingPost.objects.filter(post=self.plain_post).exists()
+        )
+        self.assertEqual(TrendingGroup.objects.count(), 0)
+
+    def test_groups_by_post_volume(self):
+        """группы упорядочены по числу новых постов"""
+        self.assertEqual(
+            [group.slug for group in trending.top()[1]], ['busy', 'quiet']
+        )
+
+    def test_page_served_from_cache(self):
+        """страница читает топ из кэша, который кладёт обновлятель"""
+        self.comment(self.plain_post)
+        call_command('update_trending', '--once', stdout=StringIO())
+        for _ in range(3):
+            self.comment(self.star_post)
+        response = Client().get(reverse('trending'))
+        self.assertEqual(list(response.context['posts']),
+                         [self.plain_post])
+        # следующий проход обновлятеля выводит новый пост наверх
+        call_command('update_trending', '--once', stdout=StringIO())
+        response = Client().get(reverse('trending'))
+        self.assertEqual(list(response.context['posts']),
+                         [self.star_post, self.plain_post])
+        self.assertContains(response, 'Шумная')
+
+    def test_updater_requires_shared_cache(self):
+        """с кэшем процесса обновлятель не запускается"""
+        locmem = {'default': settings.CACHE_BACKENDS['locmem']}
+        with override_settings(CACHES=locmem):
+            with self.assertRaisesMessage(CommandError, 'общий кэш'):
+                call_command('update_trending', '--once')
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import uploads
+from posts.models import Post, User
+
+
+def make_jpeg(size, exif=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, 'blue')
+    if exif is not None:
+        image.save(buffer, 'JPEG', exif=exif)
+    else:
+        image.save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpeg', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=500)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # картинки — во временном каталоге системы, а не в репозитории
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username='uploader')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_upload_downscaled_and_stripped(self):
+        """картинка ужимается, поворачивается по EXIF и теряет метаданные"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        exif[0x010F] = 'SecretCam'  # Make
+        self.client.post(reverse('new_post'), {
+            'text': 'большое фото', 'image': make_jpeg((2000, 1000), exif),
+        })
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with post.image.open('rb') as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (250, 500))
+            self.assertFalse(image.getexif())
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_huge_image_rejected(self):
+        """картинка больше POST_IMAGE_MAX_PIXELS не принимается"""
+        response = self.client.post(reverse('new_post'), {
+            'text': 'бомба', 'image': make_jpeg((200, 200)),
+        })
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Слишком большая картинка: 200x200'
+        )
+
+    def test_color_profile_kept_only_for_same_mode(self):
+        """цветовой профиль остаётся, только если пиксели не менялись"""
+        profile = b'profile'
+        for mode, kept in (('RGB', True), ('CMYK', False)):
+            with self.subTest(mode=mode):
+                buffer = BytesIO()
+                Image.new(mode, (10, 10)).save(
+                    buffer, 'JPEG', icc_profile=profile
+                )
+                upload = uploads.normalize_upload(SimpleUploadedFile(
+                    'photo.jpeg', buffer.getvalue(), 'image/jpeg'
+                ))
+                image = Image.open(upload)
+                self.assertEqual(image.mode, 'RGB')
+                self.assertEqual(
+                    image.info.get('icc_profile'), profile if kept else None
+                )
@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.flatpages.models import FlatPage
 from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -27,6 +28,9 @@ class StaticURLTests(TestCase):
         )
 
     def setUp(self):
+        # страницы гостя кэшируются целиком, а откат базы между тестами
+        # сигналов не посылает
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем пользователя
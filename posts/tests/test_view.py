@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.flatpages.models import FlatPage
 from django.contrib.sites.models import Site
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.test import Client, TestCase, modify_settings
 from django.urls import reverse
 
@@ -32,7 +33,7 @@ class TaskPagesTests(TestCase):
         )
 
     def setUp(self):
-        # cache.clear()
+        cache.clear()
         # create authorised client
         User = get_user_model()
         self.user1 = User.objects.create_user(
@@ -213,23 +214,35 @@ class TaskPagesTests(TestCase):
         self.assertEqual(response.status_code, 200, f'{response}')
 
     def test_home_page_show_correct_context_with_cache(self):
-        """изменение отображение контекста при работе с кэшем."""
-        # get fields in context
+        """карточка поста берётся из кэша и сбрасывается при правке."""
         client = self.authorized_client
+        client.get(reverse('index'))
+        post = Post.objects.get(pk=self.testpost.pk)
+        key = make_template_fragment_key(
+            'post_item', [post.pk, post.version]
+        )
+        # фрагмент отрисован и лежит в кэше
+        self.assertIn('ТестаПост', cache.get(key))
+        # правка поста видна сразу, без cache.clear()
+        post.text = 'ТестаПравка'
+        post.save()
         response = client.get(reverse('index'))
-        content = response.content
-        # checking fields for equal
-        self.assertEqual(response.content, content)
-        # deleting all
-        Post.objects.all().delete()
-        # checking fields for equal (cache is working)
-        response = client.get(reverse('index'))
-        self.assertEqual(response.content, content)
-        # cache.clear
-        cache.clear()
-        # checking fields for not equal (cache is clearing)
+        self.assertContains(response, 'ТестаПравка')
+        self.assertIsNone(cache.get(key))
+        # комментарий тоже сбрасывает фрагмент
+        Comment.objects.create(post=post, author=self.user1, text='к')
         response = client.get(reverse('index'))
-        self.assertNotEqual(response.content, content)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_edit_button_not_cached_between_users(self):
+        """кнопка «Редактировать» видна только автору, несмотря на кэш."""
+        edit_url = reverse('post_edit', kwargs={
+            'username': 'testa', 'post_id': self.testpost.id
+        })
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, edit_url)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertNotContains(response, edit_url)
 
     def test_follow_author(self):
         """проверка включения подписки авторизованным пользователем"""
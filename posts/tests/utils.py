@@ -0,0 +1,17 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def on_commit_callbacks():
+    """Выполняет колбэки transaction.on_commit, добавленные в блоке.
+
+    TestCase не делает COMMIT, поэтому сдвиг меток и поколений страниц
+    (posts/signals.py) без этого в тестах не произошёл бы. Замена
+    captureOnCommitCallbacks(execute=True), которого нет в Django 2.2.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    for _, callback in connection.run_on_commit[start:]:
+        callback()
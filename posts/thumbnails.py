@@ -0,0 +1,158 @@
+"""Нарезка миниатюр вне запроса.
+
+Шаблон не вызывает sorl-thumbnail напрямую: тег ready_thumbnail
+(posts/templatetags/post_images.py) только смотрит в key-value хранилище
+sorl, готова ли миниатюра, а если нет — ставит её в очередь ThumbnailJob
+и отдаёт заглушку или оригинал. Очередь разбирает thumbnail_worker
+пулом процессов, по одному на ядро: задачи берутся в аренду
+и удаляются только после удачной нарезки.
+"""
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import fragments, image_variants, page_cache, versions
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+
+class Placeholder:
+    """Пока миниатюры нет, шаблон получает объект с тем же .url."""
+
+    def __init__(self, url):
+        self.url = url
+
+
+def _thumbnail_file(file_, geometry, options):
+    # та же подготовка параметров, что в ThumbnailBackend.get_thumbnail,
+    # чтобы имя миниатюры совпало с тем, что создаст воркер
+    source = ImageFile(file_)
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def ready_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра или None; ничего не декодирует и не режет."""
+    return default.kvstore.get(_thumbnail_file(file_, geometry, options))
+
+
+def enqueue(image_name, geometry, **options):
+    ThumbnailJob.objects.get_or_create(
+        image=image_name, geometry=geometry,
+        defaults={'options': json.dumps(options, sort_keys=True)},
+    )
+
+
+def enqueue_presets(image_name):
+    """Размеры из settings.POST_THUMBNAILS и адаптивные варианты."""
+    for geometry, options in settings.POST_THUMBNAILS:
+        enqueue(image_name, geometry, **options)
+    enqueue(image_name, image_variants.VARIANTS_JOB)
+
+
+def thumbnail_or_placeholder(file_, geometry, **options):
+    if not file_:
+        return None
+    thumbnail = ready_thumbnail(file_, geometry, **options)
+    if thumbnail:
+        return thumbnail
+    enqueue(file_.name, geometry, **options)
+    return Placeholder(settings.THUMBNAIL_PLACEHOLDER_URL or file_.url)
+
+
+def claim_jobs(limit):
+    """Берёт в аренду до limit свободных задач очереди.
+
+    Задача удаляется только после удачной нарезки (run_jobs), поэтому
+    упавший воркер её не теряет: аренда истекает, и задачу забирает
+    следующий.
+    """
+    now = timezone.now()
+    lease = uuid.uuid4().hex
+    free = ThumbnailJob.objects.filter(
+        Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+    )
+    ids = list(free.order_by('id').values_list('id', flat=True)[:limit])
+    # условие свободы повторяется в UPDATE: задачи, которые между
+    # SELECT и UPDATE забрал соседний воркер, не перехватываются
+    free.filter(id__in=ids).update(
+        lease=lease, attempts=F('attempts') + 1,
+        leased_until=now + timedelta(seconds=settings.THUMBNAIL_JOB_LEASE),
+    )
+    return list(ThumbnailJob.objects.filter(lease=lease).order_by(
+        'id'
+    ).values_list('id', 'image', 'geometry', 'options'))
+
+
+def generate(job):
+    """Выполняется в процессе пула: режет одну миниатюру."""
+    job_id, image, geometry, options = job
+    close_old_connections()
+    try:
+        if geometry == image_variants.VARIANTS_JOB:
+            image_variants.store_variants(image)
+        else:
+            default.backend.get_thumbnail(
+                image, geometry, **json.loads(options)
+            )
+    except Exception:
+        logger.exception('Не удалось нарезать %s %s', image, geometry)
+        return job_id, image, False
+    return job_id, image, True
+
+
+def _requeue(job_ids):
+    """Неудачные задачи — снова в очередь, исчерпавшие попытки — вон."""
+    jobs = ThumbnailJob.objects.filter(id__in=job_ids)
+    given_up = jobs.filter(attempts__gte=settings.THUMBNAIL_JOB_ATTEMPTS)
+    for image, geometry in given_up.values_list('image', 'geometry'):
+        logger.error('Миниатюра %s %s не нарезана за %d попыток',
+                     image, geometry, settings.THUMBNAIL_JOB_ATTEMPTS)
+    given_up.delete()
+    jobs.update(lease='', leased_until=None)
+
+
+def run_jobs(jobs, pool=None):
+    """Режет миниатюры и сбрасывает кэш карточек с этими картинками."""
+    results = list(pool.map(generate, jobs) if pool else map(generate, jobs))
+    ThumbnailJob.objects.filter(
+        id__in=[job_id for job_id, image, ok in results if ok]
+    ).delete()
+    _requeue([job_id for job_id, image, ok in results if not ok])
+    done = {image for job_id, image, ok in results if ok}
+    scopes, paths = set(), set()
+    for post_id, version, author_id, group_id, username, slug in (
+            Post.objects.filter(image__in=done).values_list(
+                'id', 'version', 'author_id', 'group_id',
+                'author__username', 'group__slug')):
+        fragments.invalidate(post_id, version)
+        # страницы и ETag с этими постами ещё показывают оригинал
+        scopes.update(versions.post_scopes(post_id, author_id, group_id))
+        paths.update(page_cache.post_paths(
+            Post(pk=post_id), username=username, group_slug=slug
+        ))
+    if scopes:
+        versions.touch(*scopes)
+        page_cache.invalidate(*paths)
+    return sum(ok for job_id, image, ok in results)
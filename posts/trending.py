@@ -0,0 +1,110 @@
+"""Популярное: посты и группы по затухающей «температуре».
+
+Каждый новый комментарий прибавляет посту 1 + ln(1 + подписчики
+автора поста), каждый новый пост в группе — единицу группе. Значения
+лежат в TrendingPost и TrendingGroup с индексом по score: топ читается
+коротким проходом по индексу, а не пересчётом комментариев.
+
+Затухание и обновление топа делает команда update_trending: раз
+в TRENDING_INTERVAL секунд она умножает все score на
+2 ** (-прошедшее время / TRENDING_HALF_LIFE), выбрасывает остывшие
+строки и кладёт в кэш готовые списки id. Порядок строк от умножения
+не меняется, поэтому запросы страниц видят топ только из кэша. Кэш
+должен быть общим для всех процессов, иначе команда не запустится.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.urls import reverse
+
+from . import page_cache, versions
+from .models import Group, Post, TrendingGroup, TrendingPost
+
+POSTS_KEY = 'trending:posts'
+GROUPS_KEY = 'trending:groups'
+DECAYED_KEY = 'trending:decayed_at'
+
+
+def _heat(model, amount, **key):
+    """score += amount; строки нет — создаётся."""
+    if model.objects.filter(**key).update(score=F('score') + amount):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(score=amount, **key)
+    except IntegrityError:
+        # строку только что создал соседний запрос
+        model.objects.filter(**key).update(score=F('score') + amount)
+
+
+def comment_added(post_id):
+    followers = Post.objects.filter(pk=post_id).values_list(
+        'author__profile__followers_count', flat=True
+    ).first() or 0
+    _heat(TrendingPost, 1 + math.log1p(followers), post_id=post_id)
+
+
+def post_added(group_id):
+    _heat(TrendingGroup, 1, group_id=group_id)
+
+
+def decay(now=None):
+    """Остужает все значения на время, прошедшее с прошлого раза."""
+    now = time.time() if now is None else now
+    previous = cache.get(DECAYED_KEY)
+    cache.set(DECAYED_KEY, now, None)
+    if previous is None or now <= previous:
+        return
+    factor = 0.5 ** ((now - previous) / settings.TRENDING_HALF_LIFE)
+    with transaction.atomic():
+        for model in (TrendingPost, TrendingGroup):
+            model.objects.update(score=F('score') * factor)
+            model.objects.filter(
+                score__lt=settings.TRENDING_MIN_SCORE
+            ).delete()
+
+
+def _top_ids():
+    posts = list(TrendingPost.objects.order_by('-score').values_list(
+        'post_id', flat=True
+    )[:settings.TRENDING_SIZE])
+    groups = list(TrendingGroup.objects.order_by('-score').values_list(
+        'group_id', flat=True
+    )[:settings.TRENDING_GROUPS])
+    return posts, groups
+
+
+def refresh():
+    """Кладёт топ в кэш и сбрасывает страницу популярного."""
+    posts, groups = _top_ids()
+    cache.set_many(
+        {POSTS_KEY: posts, GROUPS_KEY: groups}, settings.TRENDING_TIMEOUT
+    )
+    versions.touch('trending')
+    page_cache.invalidate(reverse('trending'))
+    return posts, groups
+
+
+def _cached_ids():
+    cached = cache.get_many([POSTS_KEY, GROUPS_KEY])
+    if len(cached) == 2:
+        return cached[POSTS_KEY], cached[GROUPS_KEY]
+    # обновлятель не запущен или кэш сброшен
+    posts, groups = _top_ids()
+    cache.set_many(
+        {POSTS_KEY: posts, GROUPS_KEY: groups}, settings.TRENDING_TIMEOUT
+    )
+    return posts, groups
+
+
+def top():
+    """(посты, группы) из кэша в порядке убывания score."""
+    post_ids, group_ids = _cached_ids()
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    groups = Group.objects.in_bulk(group_ids)
+    return ([posts[pk] for pk in post_ids if pk in posts],
+            [groups[pk] for pk in group_ids if pk in groups])
@@ -0,0 +1,79 @@
+"""Обработка загруженной картинки поста до сохранения в MEDIA_ROOT.
+
+Картинка декодируется один раз: JPEG — сразу в уменьшенном масштабе
+(draft mode, память пропорциональна итоговому размеру, а не оригиналу),
+поворачивается по EXIF, ужимается до POST_IMAGE_MAX_SIDE и
+перекодируется без метаданных. Всё, что потом режет thumbnail_worker,
+работает уже с этой копией, а не с 20-мегабайтным оригиналом.
+"""
+import os
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def normalize_upload(upload):
+    """Возвращает новый загруженный файл или бросает ImageRejected.
+
+    У анимированных картинок остаётся первый кадр.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    try:
+        with warnings.catch_warnings():
+            # предупреждение Pillow о «бомбе» считаем ошибкой
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            # open читает только заголовок, пиксели ещё не декодированы
+            image = Image.open(upload)
+            width, height = image.size
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                raise ImageRejected(
+                    f'Слишком большая картинка: {width}x{height}'
+                )
+            if image.format == 'JPEG':
+                image.draft('RGB', (max_side, max_side))
+            icc_profile = image.info.get('icc_profile')
+            image.load()
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageRejected('Слишком большая картинка')
+    except (OSError, SyntaxError, ValueError) as error:
+        raise ImageRejected(f'Не удалось прочитать картинку: {error}')
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = BytesIO()
+    mode = 'RGBA' if _has_alpha(image) else 'RGB'
+    if image.mode != mode:
+        # профиль описывает исходные пиксели (CMYK, оттенки серого,
+        # палитра); после convert он к ним не подходит
+        icc_profile = None
+    # метаданные (EXIF, GPS, комментарии) не переносятся,
+    # остаётся только цветовой профиль
+    if mode == 'RGBA':
+        image.convert('RGBA').save(
+            buffer, 'PNG', optimize=True, icc_profile=icc_profile
+        )
+        extension, content_type = 'png', 'image/png'
+    else:
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=settings.POST_IMAGE_UPLOAD_QUALITY,
+            optimize=True, progressive=True, icc_profile=icc_profile,
+        )
+        extension, content_type = 'jpg', 'image/jpeg'
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        f'{stem}.{extension}', buffer.getvalue(), content_type
+    )
@@ -18,9 +18,13 @@ urlpatterns = [
          views.add_comment, name='add_comment'
          ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    path('trending/', views.trending_posts, name='trending'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('<str:username>/followers/', views.followers, name='followers'),
+    path('<str:username>/following/', views.following, name='following'),
     path('<str:username>/', views.profile, name='profile'),
 ]
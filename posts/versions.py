@@ -0,0 +1,110 @@
+"""Метки изменения лент для условных GET (ETag и Last-Modified).
+
+У каждой области (все посты, группа, автор, пост, подписки
+пользователя) в кэше лежит время её последнего изменения. Сигналы
+сдвигают метки, а view сверяют их с If-None-Match и If-Modified-Since
+раньше, чем обращаются к постам.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from yatube.cache import is_shared
+from yatube.db import routers
+
+from .models import Post
+
+KEY_PREFIX = 'versions:'
+
+
+def _key(scope):
+    return KEY_PREFIX + scope
+
+
+def touch(*scopes):
+    now = time.time()
+    cache.set_many({_key(scope): now for scope in scopes}, None)
+
+
+def last_modified(*scopes):
+    """Время последнего изменения любой из областей."""
+    keys = [_key(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in stamps:
+            # метка потерялась вместе с кэшем: считаем, что всё
+            # изменилось сейчас, клиенты просто перезапросят ленту
+            cache.add(key, now, None)
+            stamps[key] = cache.get(key, now)
+    return max(stamps.values())
+
+
+def post_scopes(post_id, author_id, group_id):
+    scopes = ['posts', f'author:{author_id}', f'post:{post_id}']
+    if group_id is not None:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def post_scopes_by_id(post_id):
+    """Как post_scopes, но по id: для комментариев и миниатюр."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    return post_scopes(post_id, *row) if row is not None else []
+
+
+def condition_on(scopes, per_user=False):
+    """condition() с метками областей, которые вернула scopes(request, ...).
+
+    ETag зависит ещё и от адреса (курсор), а с per_user — от
+    пользователя и его CSRF-куки: в HTML есть имя, кнопки автора и формы.
+    Метки читаются один раз на запрос. Если страница менялась так
+    недавно, что реплика могла этого ещё не получить, запрос уходит
+    в основную базу, а scopes перечитывает свои объекты уже оттуда.
+    С кэшем, своим у каждого процесса, метки сдвигает только воркер,
+    принявший правку, поэтому валидаторы не отдаются и 304 не бывает.
+    """
+    def stamp(request, *args, **kwargs):
+        if not hasattr(request, 'feed_stamp'):
+            names = ['groups', *scopes(request, *args, **kwargs)]
+            modified = last_modified(*names)
+            if routers.primary_if_changed(modified):
+                names = ['groups', *scopes(request, *args, **kwargs)]
+                modified = last_modified(*names)
+            request.feed_stamp = (names, modified)
+        return request.feed_stamp
+
+    def etag(request, *args, **kwargs):
+        names, modified = stamp(request, *args, **kwargs)
+        raw = f'{modified!r} {" ".join(names)} {request.get_full_path()}'
+        if per_user:
+            csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+            raw += f' {request.user.pk} {csrf}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def modified_at(request, *args, **kwargs):
+        modified = stamp(request, *args, **kwargs)[1]
+        return datetime.fromtimestamp(modified, timezone.utc)
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=modified_at
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_shared():
+                # scopes заодно находит объекты страницы (и отвечает 404),
+                # view берёт их из request
+                scopes(request, *args, **kwargs)
+                return view(request, *args, **kwargs)
+            return conditional(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,20 +1,52 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
+from posts import (feed, follow_cache, search, suggestions, trending,
+                   versions)
 from posts.forms import CommentForm, PostForm
+from posts.paginator import CursorPaginator
+from yatube.cache import is_shared
 
 from .models import Follow, Group, Post, User
 
-from yatube import settings
 
+def http_cache(view):
+    """Заголовки кэширования для HTML-страниц лент.
 
+    Анонимные страницы одинаковы для всех, их может держать CDN или
+    обратный прокси (s-maxage), браузер каждый раз сверяет ETag.
+    Страницы вошедшего пользователя — только в его браузере. Без общего
+    кэша метки лент ненадёжны (posts/versions.py), и s-maxage не ставится.
+    """
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        elif is_shared():
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.HTML_CACHE_S_MAXAGE,
+            )
+        else:
+            patch_cache_control(response, public=True, max_age=0)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def _index_scopes(request):
+    return ['posts']
+
+
+@http_cache
+@versions.condition_on(_index_scopes, per_user=True)
 def index(request):
-    posts = Post.objects.select_related('group').all()
-    paginator = Paginator(posts, settings.PAGINATOR_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.for_feed()
+    paginator = CursorPaginator(posts, settings.PAGINATOR_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('cursor'))
     return render(
          request,
          'index.html',
@@ -22,12 +54,33 @@ def index(request):
      )
 
 
+def _trending_scopes(request):
+    # топ сдвигает команда update_trending, правки постов — сигналы
+    return ['posts', 'trending']
+
+
+@http_cache
+@versions.condition_on(_trending_scopes, per_user=True)
+def trending_posts(request):
+    posts, groups = trending.top()
+    return render(request, 'trending.html', {
+        'posts': posts,
+        'groups': groups,
+    })
+
+
+def _group_scopes(request, slug):
+    request.key_group = get_object_or_404(Group, slug=slug)
+    return [f'group:{request.key_group.pk}']
+
+
+@http_cache
+@versions.condition_on(_group_scopes, per_user=True)
 def group_posts(request, slug):
-    key_group = get_object_or_404(Group, slug=slug)
-    posts = key_group.posts.all()
-    paginator = Paginator(posts, settings.PAGINATOR_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    key_group = request.key_group
+    posts = key_group.posts.for_feed()
+    paginator = CursorPaginator(posts, settings.PAGINATOR_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('cursor'))
     context = {
         'group': key_group,
         'posts': posts,
@@ -39,13 +92,27 @@ def group_posts(request, slug):
     return render(request, 'group.html', context)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page = paginator = None
+    if query:
+        results, ordering, transform = search.search_paginator_args(query)
+        paginator = CursorPaginator(
+            results, settings.PAGINATOR_PAGE_SIZE,
+            ordering=ordering, transform=transform,
+        )
+        page = paginator.get_page(request.GET.get('cursor'))
+    context = {'query': query, 'page': page, 'paginator': paginator}
+    return render(request, 'search.html', context)
+
+
+@transaction.atomic
 def new_post(request):
     if request.method == 'POST':
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
-            instance = form.save(commit=False)
-            instance.author = request.user
-            instance.save()
+            form.instance.author = request.user
+            form.save()
             return redirect('index')
 
         return render(request, 'new.html', {'form': form})
@@ -53,23 +120,29 @@ def new_post(request):
     return render(request, 'new.html', {'form': form})
 
 
+def _profile_scopes(request, username):
+    request.profile_user = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    # кнопка «подписаться» и блок «с ним читают» зависят
+    # от подписок читателя
+    return [f'author:{request.profile_user.pk}',
+            f'follow:{request.user.pk}', 'suggestions']
+
+
+@http_cache
+@versions.condition_on(_profile_scopes, per_user=True)
 def profile(request, username):
-    profile_user = get_object_or_404(User, username=username)
-    user_posts = profile_user.posts.all()
-    paginator_profile = Paginator(user_posts, settings.PAGINATOR_PAGE_SIZE)
-    page_num_profile = request.GET.get('page')
-    page_profile = paginator_profile.get_page(page_num_profile)
-    # запрашиваем является ли текущий пользователь подписчиком автора
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=profile_user
-        ).exists()
-    else:
-        following = False
-    # считаем количество подписчиков на автора
-    roster_followings = Follow.objects.filter(author=profile_user).count()
-    # считаем количество подписок автора
-    roster_followers = Follow.objects.filter(user=profile_user).count()
+    profile_user = request.profile_user
+    user_posts = profile_user.posts.for_feed()
+    paginator_profile = CursorPaginator(
+        user_posts, settings.PAGINATOR_PAGE_SIZE
+    )
+    page_profile = paginator_profile.get_page(request.GET.get('cursor'))
+    # подписки читателя — из кэша в памяти, без запроса к базе
+    following = follow_cache.following.is_following(
+        request.user, profile_user.pk
+    )
     context = {
         'page': page_profile,
         'paginator': paginator_profile,
@@ -77,25 +150,98 @@ def profile(request, username):
         'post': user_posts,
         'post_author': profile_user,
         'following': following,
-        'roster_followings': roster_followings,
-        'roster_followers': roster_followers,
+        'suggestions': suggestions.related_to(profile_user, request.user),
+        'suggestions_title': 'С этим автором читают',
     }
     return render(request, 'profile.html', context)
 
 
+def _follow_list_scopes(request, username):
+    request.profile_user = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    # в списке отмечены те, на кого подписан читатель
+    return [f'author:{request.profile_user.pk}',
+            f'follow:{request.user.pk}']
+
+
+def _follow_list(request, side, other, title):
+    """Подписчики (side='author') или подписки (side='user') профиля.
+
+    Курсор идёт по id подписки (индексы follow_author_idx
+    и follow_user_idx), поэтому у автора с миллионом подписчиков
+    дальние страницы стоят столько же, сколько первая.
+    """
+    profile_user = request.profile_user
+    follows = Follow.objects.filter(**{side: profile_user}).select_related(
+        f'{other}__profile'
+    )
+    # отметки «вы подписаны» — из множества подписок читателя
+    # (posts/follow_cache.py), не больше одного запроса на страницу
+    followed = (follow_cache.following.authors(request.user.pk)
+                if request.user.is_authenticated else frozenset())
+
+    def transform(rows):
+        users = [getattr(follow, other) for follow in rows]
+        for user in users:
+            user.you_follow = user.pk in followed
+        return users
+
+    paginator = CursorPaginator(
+        follows, settings.PAGINATOR_PAGE_SIZE, ordering=('-id',),
+        transform=transform,
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    context = {
+        'page': page,
+        'paginator': paginator,
+        'post_author': profile_user,
+        'following': profile_user.pk in followed,
+        'title': title,
+    }
+    return render(request, 'follow_list.html', context)
+
+
+@http_cache
+@versions.condition_on(_follow_list_scopes, per_user=True)
+def followers(request, username):
+    return _follow_list(request, 'author', 'user', 'Подписчики')
+
+
+@http_cache
+@versions.condition_on(_follow_list_scopes, per_user=True)
+def following(request, username):
+    return _follow_list(request, 'user', 'author', 'Подписки')
+
+
+def _post_scopes(request, username, post_id):
+    # автор и его профиль приходят тем же запросом, что и пост
+    request.one_post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__profile'),
+        author__username=username, id=post_id,
+    )
+    # в карточке автора его счётчики записей и подписчиков
+    return [f'post:{post_id}', f'author:{request.one_post.author_id}']
+
+
+@http_cache
+@versions.condition_on(_post_scopes, per_user=True)
 def post_view(request, username, post_id):
-    one_post = get_object_or_404(
-        Post, author__username=username, id=post_id
+    one_post = request.one_post
+    comments = one_post.comments.select_related('author')
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PAGE_SIZE, ordering=('created', 'id')
     )
-    user = get_object_or_404(User, username=username)
-    comments = one_post.comments.all()
-    count = Post.objects.filter(author=user).count()
+    page = paginator.get_page(request.GET.get('cursor'))
+    count = one_post.author.profile.posts_count
     form = CommentForm()
     context = {
         'post': one_post,
         'post_author': one_post.author,
         'post_id': post_id,
         'comments': comments,
+        'comments_page': page,
+        'paginator': paginator,
         "count": count,
         "form": form,
     }
@@ -110,7 +256,9 @@ def post_edit(request, username, post_id):
     if request.user != post_edit.author:
         return redirect('post', username=username, post_id=post_id)
     if form.is_valid():
-        form.save()
+        # сигналы пишут в несколько таблиц: одна транзакция на всё
+        with transaction.atomic():
+            form.save()
         return redirect('post', username=username, post_id=post_id)
     context = {
         'form': form,
@@ -137,6 +285,7 @@ def server_error(request):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
@@ -147,18 +296,32 @@ def add_comment(request, username, post_id):
     return redirect('post', username, post_id)
 
 
+def _follow_scopes(request):
+    return ['posts', f'follow:{request.user.pk}', 'suggestions']
+
+
 @login_required
+@http_cache
+@versions.condition_on(_follow_scopes, per_user=True)
 def follow_index(request):
     # информация о текущем пользователе доступна в переменной request.user
-    roster_of_posts = Post.objects.filter(author__following__user=request.user)
-    paginator_fol = Paginator(roster_of_posts, settings.PAGINATOR_PAGE_SIZE)
-    page_num_fol = request.GET.get('page')
-    page = paginator_fol.get_page(page_num_fol)
+    # лента собрана заранее (posts/feed.py), читаем её по индексу
+    roster_of_posts, ordering, transform = feed.feed_paginator_args(
+        request.user
+    )
+    paginator_fol = CursorPaginator(
+        roster_of_posts, settings.PAGINATOR_PAGE_SIZE,
+        ordering=ordering, transform=transform,
+    )
+    page = paginator_fol.get_page(request.GET.get('cursor'))
     context = {
         'page': page,
         'paginator': paginator_fol,
         'user': request.user,
         'post_author': roster_of_posts,
+        # списки считает команда suggest_authors (posts/suggestions.py)
+        'suggestions': suggestions.for_user(request.user),
+        'suggestions_title': 'Кого почитать',
     }
     return render(request, "follow.html", context)
 
@@ -168,18 +331,20 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author == request.user:
         return redirect('profile', username=username)
-    # this method is more concise, thanks!
-    Follow.objects.get_or_create(
-        author=get_object_or_404(User, username=username),
-        user=request.user,
-    )
+    # кэш подписок (posts/follow_cache.py) может отставать, поэтому
+    # запись решает уникальный индекс, а не он
+    try:
+        with transaction.atomic():
+            Follow.objects.create(author=author, user=request.user)
+    except IntegrityError:
+        # уже подписан
+        pass
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        author=get_object_or_404(User, username=username),
-        user=request.user,
-    ).delete()
+    author = get_object_or_404(User, username=username)
+    with transaction.atomic():
+        Follow.objects.filter(author=author, user=request.user).delete()
     return redirect('profile', username=username)
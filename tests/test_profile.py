@@ -1,6 +1,6 @@
 import pytest
 
-from django.core.paginator import Paginator, Page
+from posts.paginator import CursorPage, CursorPaginator
 from django.contrib.auth import get_user_model
 
 
@@ -26,15 +26,15 @@ class TestProfileView:
         profile_context = get_field_context(response.context, get_user_model())
         assert profile_context is not None, 'Проверьте, что передали автора в контекст страницы `/<username>/`'
 
-        page_context = get_field_context(response.context, Page)
+        page_context = get_field_context(response.context, CursorPage)
         assert page_context is not None, \
-            'Проверьте, что передали статьи автора в контекст страницы `/<username>/` типа `Page`'
+            'Проверьте, что передали статьи автора в контекст страницы `/<username>/` типа `CursorPage`'
         assert len(page_context.object_list) == 1, \
             'Проверьте, что правильные статьи автора в контекст страницы `/<username>/`'
 
-        paginator_context = get_field_context(response.context, Paginator)
+        paginator_context = get_field_context(response.context, CursorPaginator)
         assert paginator_context is not None, \
-            'Проверьте, что передали паджинатор в контекст страницы `/<username>/` типа `Paginator`'
+            'Проверьте, что передали паджинатор в контекст страницы `/<username>/` типа `CursorPaginator`'
 
         new_user = get_user_model()(username='new_user_87123478')
         new_user.save()
@@ -45,8 +45,8 @@ class TestProfileView:
         if new_response.status_code in (301, 302):
             new_response = client.get(f'/{new_user.username}/')
 
-        page_context = get_field_context(new_response.context, Page)
+        page_context = get_field_context(new_response.context, CursorPage)
         assert page_context is not None, \
-            'Проверьте, что передали статьи автора в контекст страницы `/<username>/` типа `Page`'
+            'Проверьте, что передали статьи автора в контекст страницы `/<username>/` типа `CursorPage`'
         assert len(page_context.object_list) == 0, \
             'Проверьте, что правильные статьи автора в контекст страницы `/<username>/`'
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('users', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id) for user_id in
+        User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    )
+    Profile.objects.update(
+        posts_count=count_of(Post, 'author', 'user_id'),
+        followers_count=count_of(Follow, 'author', 'user_id'),
+        following_count=count_of(Follow, 'user', 'user_id'),
+    )
+    Post.objects.update(comments_count=count_of(Comment, 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('posts', '0011_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
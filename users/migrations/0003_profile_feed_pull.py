@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feed_pull(apps, schema_editor):
+    # раньше режим жил в кэше; при его потере авторами в режиме чтения
+    # считались все, у кого подписчиков не меньше нижнего порога
+    Profile = apps.get_model('users', 'Profile')
+    Profile.objects.filter(
+        followers_count__gte=settings.FEED_FANOUT_RESUME_FOLLOWERS
+    ).update(feed_pull=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_fill_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='feed_pull',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(feed_pull=True), fields=['user'], name='profile_feed_pull_idx'),
+        ),
+        migrations.RunPython(fill_feed_pull, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,35 @@
+from django.contrib.auth import get_user_model
 from django.db import models
 
-# Create your models here.
+User = get_user_model()
+
+
+class Profile(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Обновляются сигналами posts/signals.py, расхождения
+    чинит команда recount.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="profile"
+    )
+    # количество записей пользователя
+    posts_count = models.PositiveIntegerField(default=0)
+    # сколько человек подписано на пользователя
+    followers_count = models.PositiveIntegerField(default=0)
+    # на скольких авторов подписан пользователь
+    following_count = models.PositiveIntegerField(default=0)
+    # посты пользователя не рассылаются по лентам подписчиков,
+    # а дочитываются при показе (posts/feed.py)
+    feed_pull = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user'], name='profile_feed_pull_idx',
+                condition=models.Q(feed_pull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f'профиль {self.user_id}'
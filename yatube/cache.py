@@ -0,0 +1,306 @@
+"""Кэш в общем файле SQLite для нескольких процессов одной машины.
+
+LocMemCache у каждого воркера gunicorn свой: холодный после старта
+и занимает память в каждом процессе. Этот бэкенд хранит записи в одном
+файле (WAL, поэтому чтения не блокируют запись), вытесняет давно не
+читанные записи по размеру и количеству, атомарно увеличивает числа
+и ведёт статистику попаданий и промахов.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.SharedFileCache',
+            'LOCATION': '/var/tmp/yatube_cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+# время последнего чтения обновляется не чаще, чем раз в столько секунд:
+# для LRU этого достаточно, а лишние записи в файл дороги
+ACCESS_RESOLUTION = 1.0
+# локальные счётчики статистики сбрасываются в файл раз в столько секунд
+STATS_FLUSH_INTERVAL = 5.0
+STAT_NAMES = ('hits', 'misses', 'sets', 'deletes', 'evictions')
+# бэкенды, у которых записи свои в каждом процессе
+PROCESS_LOCAL = (LocMemCache,)
+
+
+def is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Видят ли все процессы одни и те же записи кэша alias.
+
+    Поколения страниц, метки изменения лент и готовые списки, которые
+    пишет один процесс, а читают другие, имеют смысл только в таком кэше.
+    """
+    return not isinstance(caches[alias], PROCESS_LOCAL)
+
+
+class SharedFileCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self._timeout_ms = int(options.get('BUSY_TIMEOUT', 5000))
+        # размер кэша проверяется раз в столько записей процесса:
+        # COUNT/SUM по всей таблице на каждый set слишком дорог
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._pending = dict.fromkeys(STAT_NAMES, 0)
+        self._flushed_at = time.time()
+        self._sets_since_cull = 0
+
+    # соединения
+
+    def _connection(self):
+        # соединение своё у каждого потока и у каждого процесса после fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self._path, timeout=self._timeout_ms / 1000,
+            isolation_level=None, check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def close(self, **kwargs):
+        # соединение живёт всё время работы потока, закрывать после
+        # каждого запроса (как делает Django) незачем
+        self._flush_stats()
+
+    # значения: целые храним как есть, чтобы incr был одним UPDATE
+
+    def _encode(self, value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value, 8
+        data = pickle.dumps(value, self.pickle_protocol)
+        return sqlite3.Binary(data), len(data)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    # статистика
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._pending[name] += amount
+        if time.time() - self._flushed_at > STATS_FLUSH_INTERVAL:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._stats_lock:
+            pending = {k: v for k, v in self._pending.items() if v}
+            self._pending = dict.fromkeys(STAT_NAMES, 0)
+            self._flushed_at = time.time()
+        if not pending:
+            return
+        self._connection().executemany(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            pending.items(),
+        )
+
+    def get_stats(self):
+        """Статистика всех процессов, работающих с этим файлом."""
+        self._flush_stats()
+        conn = self._connection()
+        stats = dict.fromkeys(STAT_NAMES, 0)
+        stats.update(conn.execute('SELECT name, value FROM stats'))
+        stats['entries'], stats['size'] = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache'
+        ).fetchone()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    # операции BaseCache
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT value, accessed FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, now),
+        ).fetchone()
+        if row is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        if now - row[1] > ACCESS_RESOLUTION:
+            conn.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key)
+            )
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        result = {}
+        for key in keys:
+            value = self.get(key, self, version)
+            if value is not self:
+                result[key] = value
+        return result
+
+    def _store(self, mode, key, value, timeout, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        data, size = self._encode(value)
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if mode == 'add':
+                # просроченная запись add() не мешает
+                conn.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (key, now),
+                )
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?)',
+                    (key, data, expires, now, size),
+                )
+            else:
+                cursor = conn.execute(
+                    'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                    (key, data, expires, now, size),
+                )
+            stored = cursor.rowcount > 0
+            if stored:
+                self._sets_since_cull += 1
+                if self._sets_since_cull >= self._cull_every:
+                    self._sets_since_cull = 0
+                    self._cull(conn, now)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if stored:
+            self._count('sets')
+        return stored
+
+    def _cull(self, conn, now):
+        entries, size = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        evicted = conn.execute(
+            'DELETE FROM cache WHERE expires <= ?', (now,)
+        ).rowcount
+        entries -= evicted
+        if entries > self._max_entries or size > self._max_size:
+            # как в Django: за раз вытесняется 1/cull_frequency записей,
+            # начиная с давно не читанных
+            victims = max(entries // self._cull_frequency, 1)
+            evicted += conn.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (victims,),
+            ).rowcount
+        self._count('evictions', evicted)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store('add', key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store('set', key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        now = time.time()
+        return self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+        self._count('deletes')
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return self._connection().execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        now = time.time()
+        conn = self._connection()
+        # сложение выполняет сам SQLite под блокировкой записи,
+        # поэтому одновременные incr из разных процессов не теряются
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            updated = conn.execute(
+                'UPDATE cache SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, now, key, now),
+            ).rowcount
+            row = conn.execute(
+                'SELECT value FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            raise ValueError("Key '%s' not found" % key)
+        if not updated:
+            raise TypeError("Value of key '%s' is not an integer" % key)
+        return row[0]
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM cache')
+        conn.execute('DELETE FROM stats')
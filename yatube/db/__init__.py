@@ -0,0 +1,10 @@
+"""Бэкенды базы данных проекта.
+
+Обёртки над стандартными бэкендами Django 2.2, которые добавляют то,
+что в самом Django появилось позже: проверку постоянного соединения
+перед первым запросом к базе (CONN_HEALTH_CHECKS, Django 4.1), а для
+SQLite — PRAGMA при подключении и BEGIN IMMEDIATE в транзакциях
+(OPTIONS init_command и transaction_mode, Django 5.1). Ключи настроек
+названы так же, как в новых версиях, чтобы переход на них свёлся
+к замене ENGINE.
+"""
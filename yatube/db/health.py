@@ -0,0 +1,37 @@
+class HealthCheckMixin:
+    """Проверка постоянного соединения в начале каждого запроса.
+
+    С CONN_MAX_AGE > 0 соединение переживает запрос, и если сервер
+    базы его закрыл (перезапуск, таймаут простоя, pgbouncer), первый
+    же запрос следующего получил бы ошибку. С CONN_HEALTH_CHECKS
+    соединение перед первым использованием в запросе проверяется
+    и при необходимости открывается заново.
+    """
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def connect(self):
+        super().connect()
+        # только что открытое соединение проверять незачем
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # вызывается на границах запроса (request_started/finished)
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
@@ -0,0 +1,13 @@
+"""PostgreSQL с проверкой постоянных соединений.
+
+Пула соединений в Django 2.2 нет: каждый поток воркера держит своё
+соединение (CONN_MAX_AGE), а общий пул даёт pgbouncer перед базой —
+профиль 'pgbouncer' в settings.py.
+"""
+from django.db.backends.postgresql import base
+
+from ..health import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
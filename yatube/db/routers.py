@@ -0,0 +1,103 @@
+"""Чтение лент с реплик, запись — в основную базу.
+
+ReplicaMiddleware разрешает чтение с реплики только GET-запросам к
+адресам из REPLICA_READ_VIEWS, и только моделям приложений из
+REPLICA_READ_APPS: сессии и пользователь запроса всегда читаются
+из основной базы. Всё остальное, в том числе всё после первой записи
+в запросе (и select_for_update), идёт в основную базу.
+
+Реплика отстаёт, поэтому:
+
+* кто сам что-то записал, следующие REPLICA_LAG_SECONDS читает из
+  основной базы (кука REPLICA_PIN_COOKIE) и видит свою запись;
+* если данные страницы менялись последние REPLICA_LAG_SECONDS
+  (метки posts/versions.py), страница строится из основной базы,
+  иначе устаревшая копия ушла бы в кэш страниц и под новым ETag.
+
+Без DATABASE_REPLICAS роутер всё отправляет в основную базу.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def reading_replica():
+    return getattr(_state, 'replica', False)
+
+
+def use_primary():
+    _state.replica = False
+
+
+def primary_if_changed(modified):
+    """Переводит запрос на основную базу, если данные изменились
+    позже, чем их гарантированно получила реплика. True, если запрос
+    до этого читал реплику и прочитанное стоит перечитать."""
+    if not reading_replica():
+        return False
+    if time.time() - modified >= settings.REPLICA_LAG_SECONDS:
+        return False
+    use_primary()
+    return True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not reading_replica()
+                or model._meta.app_label not in settings.REPLICA_READ_APPS):
+            # явно, а не None: иначе Django взял бы базу из подсказки
+            # instance, то есть ту, с которой объект прочитан
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # прочитать свою запись в том же запросе
+        use_primary()
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схему реплики получают вместе с данными
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Стоит после AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = False
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_LAG_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            _state.replica = False
+            _state.wrote = False
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replica = (
+            bool(settings.DATABASE_REPLICAS)
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
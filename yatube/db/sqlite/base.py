@@ -0,0 +1,80 @@
+"""SQLite, настроенный для нескольких пишущих воркеров.
+
+OPTIONS понимает два ключа сверх параметров sqlite3.connect:
+
+    init_command      SQL, выполняемый на каждом новом соединении
+                      (PRAGMA через «;»)
+    transaction_mode  DEFERRED, IMMEDIATE или EXCLUSIVE для BEGIN
+
+По умолчанию транзакция SQLite берёт блокировку на запись только на
+первой записи. Если к этому моменту другой воркер уже пишет или успел
+закоммитить после нашего чтения, SQLite сразу отвечает «database is
+locked»: ожидание (timeout) тут не помогает, иначе две транзакции
+ждали бы друг друга. BEGIN IMMEDIATE берёт блокировку в начале
+atomic(), и конкурирующие записи просто ждут своей очереди.
+
+bulk_create Django 2.2 пишет строки через SELECT ... UNION ALL (не
+больше 500 на запрос) и считает предел параметров равным 999, как
+в старых сборках SQLite. Здесь строки идут одним VALUES, а предел
+берётся у самого соединения (с 3.32 он 32766), поэтому порции
+в десятки раз крупнее.
+"""
+import sqlite3
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base, operations
+
+from ..health import HealthCheckMixin
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+# предел, если Python не умеет его узнать (getlimit — с 3.11)
+DEFAULT_MAX_VARIABLES = 999
+
+
+class DatabaseOperations(operations.DatabaseOperations):
+
+    def max_variables(self):
+        self.connection.ensure_connection()
+        getlimit = getattr(self.connection.connection, 'getlimit', None)
+        if getlimit is None:
+            return DEFAULT_MAX_VARIABLES
+        return getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+
+    def bulk_batch_size(self, fields, objs):
+        if not fields:
+            return len(objs)
+        return self.max_variables() // len(fields)
+
+    def bulk_insert_sql(self, fields, placeholder_rows):
+        return 'VALUES ' + ', '.join(
+            '(%s)' % ', '.join(row) for row in placeholder_rows
+        )
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    ops_class = DatabaseOperations
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.init_command = params.pop('init_command', None)
+        mode = params.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+        self.transaction_mode = mode and mode.upper()
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if self.init_command:
+            conn.executescript(self.init_command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,295 @@
+"""Метрики запросов в формате Prometheus.
+
+MetricsMiddleware считает по имени адреса (view_name из urls.py)
+время ответа, число и время SQL-запросов, время отрисовки шаблонов
+и попадания в кэш. Каждый процесс копит приращения в памяти под
+блокировкой и раз в FLUSH_INTERVAL секунд складывает их в общий файл
+SQLite (METRICS_PATH), поэтому /metrics показывает сумму по всем
+воркерам. Без METRICS_PATH метрики остаются в памяти процесса.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+
+# приращения сбрасываются в общий файл раз в столько секунд
+FLUSH_INTERVAL = 5.0
+
+# имя, тип и описание для # TYPE и # HELP
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по адресу, методу и статусу'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа'),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов'),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Суммарное время отрисовки шаблонов'),
+    'yatube_cache_hits_total': (
+        'counter', 'Попадания в кэш'),
+    'yatube_cache_misses_total': (
+        'counter', 'Промахи кэша'),
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+'''
+
+_MISSING = object()
+# состояние текущего запроса, которое видят обёртки шаблонов и кэша
+_current = threading.local()
+
+
+class Registry:
+    """Счётчики процесса и их общий файл."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._flushed_at = time.time()
+        self._local = threading.local()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._pending[key] += amount
+
+    def observe(self, name, labels, value, buckets):
+        # в памяти бакеты не накопительные: одно приращение на наблюдение,
+        # накопительные значения считаются при выводе
+        bound = next((b for b in buckets if value <= b), float('inf'))
+        labels = dict(labels)
+        with self._lock:
+            for suffix, amount, extra in (
+                    ('_bucket', 1, {'le': bound}),
+                    ('_sum', value, {}),
+                    ('_count', 1, {})):
+                key = (name + suffix,
+                       tuple(sorted({**labels, **extra}.items())))
+                self._pending[key] += amount
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def maybe_flush(self):
+        if self.path and time.time() - self._flushed_at > FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = defaultdict(float)
+            self._flushed_at = time.time()
+        if not pending:
+            return
+        self._connection().executemany(
+            'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+            'ON CONFLICT(name, labels) '
+            'DO UPDATE SET value = value + excluded.value',
+            [(name, json.dumps(labels), value)
+             for (name, labels), value in pending.items()],
+        )
+
+    def collect(self):
+        """Все значения: {(имя, метки): значение}."""
+        if not self.path:
+            with self._lock:
+                return dict(self._pending)
+        self.flush()
+        return {
+            (name, tuple(tuple(pair) for pair in json.loads(labels))): value
+            for name, labels, value in self._connection().execute(
+                'SELECT name, labels, value FROM samples'
+            )
+        }
+
+
+registry = Registry(getattr(settings, 'METRICS_PATH', None))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"'))
+        for key, value in labels
+    )
+    return '{%s}' % pairs
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def render(samples):
+    """Текстовый формат Prometheus."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (sample, labels), value in sorted(samples.items()):
+                if sample == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value!r}')
+            continue
+        # гистограмма: накопительные бакеты по каждому набору меток
+        series = defaultdict(dict)
+        for (sample, labels), value in samples.items():
+            if sample == name + '_bucket':
+                rest = tuple(pair for pair in labels if pair[0] != 'le')
+                series[rest][dict(labels)['le']] = value
+        for labels, counts in sorted(series.items()):
+            total = 0
+            bounds = sorted(
+                set(settings.METRICS_LATENCY_BUCKETS) | set(counts)
+                | {float('inf')}
+            )
+            for bound in bounds:
+                total += counts.get(bound, 0)
+                le = labels + (('le', _format_le(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(le)} {total!r}')
+            for suffix in ('_sum', '_count'):
+                value = samples.get((name + suffix, labels), 0)
+                lines.append(
+                    f'{name}{suffix}{_format_labels(labels)} {value!r}'
+                )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class _RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # обёртка connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def _install_hooks():
+    """Обёртки отрисовки шаблонов и чтения из кэша, один раз на процесс.
+
+    У Django нет сигналов для этих событий вне тестов, поэтому
+    оборачиваются методы классов; без активного запроса обёртки только
+    вызывают исходный метод.
+    """
+    if getattr(Template.render, 'metrics_hook', False):
+        return
+    original_render = Template.render
+
+    def render_template(self, *args, **kwargs):
+        stats = getattr(_current, 'stats', None)
+        if stats is None:
+            return original_render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            stats.render_time += time.perf_counter() - started
+
+    render_template.metrics_hook = True
+    Template.render = render_template
+
+    # get_many всех используемых бэкендов идёт через get
+    cache_class = type(caches['default'])
+    original_get = cache_class.get
+
+    def cache_get(self, key, default=None, version=None):
+        value = original_get(self, key, _MISSING, version)
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+
+    cache_class.get = cache_get
+
+
+class MetricsMiddleware:
+    """Стоит первым в MIDDLEWARE, чтобы время включало все остальные."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_hooks()
+
+    def __call__(self, request):
+        stats = _RequestStats()
+        _current.stats = stats
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(stats)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.stats = None
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        labels = {'view': view}
+        registry.inc('yatube_requests_total', {
+            **labels, 'method': request.method,
+            'status': response.status_code,
+        })
+        registry.observe(
+            'yatube_request_duration_seconds', labels, duration,
+            settings.METRICS_LATENCY_BUCKETS,
+        )
+        for name, value in (
+                ('yatube_db_queries_total', stats.queries),
+                ('yatube_db_query_seconds_total', stats.query_time),
+                ('yatube_template_render_seconds_total', stats.render_time),
+                ('yatube_cache_hits_total', stats.cache_hits),
+                ('yatube_cache_misses_total', stats.cache_misses)):
+            if value:
+                registry.inc(name, labels, value)
+        registry.maybe_flush()
+        return response
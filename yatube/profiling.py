@@ -0,0 +1,161 @@
+"""Выборочный профилировщик медленных запросов.
+
+Включается переменной окружения YATUBE_PROFILE=1; выключенный не
+попадает в цепочку middleware вовсе (MiddlewareNotUsed). Включённый
+запускает в процессе один фоновый поток, который раз в
+PROFILER_INTERVAL секунд снимает стеки потоков, обслуживающих запросы.
+Если запрос оказался медленнее PROFILER_SLOW_SECONDS или попал в
+каждый PROFILER_SAMPLE_EVERY-й, в PROFILER_DIR пишутся:
+
+    <время>-<pid>-<адрес>-<мс>ms.collapsed  стеки для flamegraph.pl
+    <время>-<pid>-<адрес>-<мс>ms.sql        SQL-запросы с их временем
+
+Остальным запросам профилировщик стоит словаря стеков в памяти,
+который потом выбрасывается.
+"""
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class _Profile:
+    def __init__(self):
+        self.stacks = Counter()
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # обёртка connection.execute_wrapper; параметры не пишем —
+        # в них бывают личные данные
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+
+def _path_prefixes():
+    """Каталоги sys.path с разделителем, от самых длинных к коротким."""
+    return [
+        path + os.sep
+        for path in sorted(sys.path, key=len, reverse=True) if path
+    ]
+
+
+def _frame_label(frame, prefixes):
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in prefixes:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{code.co_name} ({filename}:{frame.f_lineno})'
+
+
+def _stack(frame, prefixes):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame, prefixes))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Sampler:
+    """Фоновый поток, снимающий стеки зарегистрированных потоков."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+    def start(self, profile):
+        with self._wakeup:
+            self._active[threading.get_ident()] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='yatube-profiler', daemon=True
+                )
+                self._thread.start()
+            self._wakeup.notify()
+
+    def stop(self):
+        with self._wakeup:
+            self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        own = threading.get_ident()
+        # sys.path после запуска не меняется, сортировать его на каждый
+        # кадр каждого стека незачем
+        prefixes = _path_prefixes()
+        while True:
+            with self._wakeup:
+                # без активных запросов поток спит и не тратит процессор
+                while not self._active:
+                    self._wakeup.wait()
+                active = dict(self._active)
+            frames = sys._current_frames()
+            for ident, profile in active.items():
+                frame = frames.get(ident)
+                if frame is not None and ident != own:
+                    profile.stacks[_stack(frame, prefixes)] += 1
+            time.sleep(self.interval)
+
+
+class SamplingProfilerMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sampler = Sampler(settings.PROFILER_INTERVAL)
+        self._counter = itertools.count(1)
+
+    def __call__(self, request):
+        profile = _Profile()
+        self.sampler.start(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(profile)
+                    )
+                response = self.get_response(request)
+        finally:
+            self.sampler.stop()
+        duration = time.perf_counter() - started
+        every = settings.PROFILER_SAMPLE_EVERY
+        sampled = every and next(self._counter) % every == 0
+        if duration >= settings.PROFILER_SLOW_SECONDS or sampled:
+            self._write(request, duration, profile)
+        return response
+
+    @staticmethod
+    def _write(request, duration, profile):
+        directory = settings.PROFILER_DIR
+        os.makedirs(directory, exist_ok=True)
+        match = request.resolver_match
+        name = match.view_name if match else request.path
+        name = re.sub(r'[^\w.-]+', '_', name).strip('_') or 'root'
+        base = os.path.join(directory, '%s-%d-%s-%dms' % (
+            time.strftime('%Y%m%d%H%M%S'), os.getpid(), name,
+            duration * 1000,
+        ))
+        with open(base + '.collapsed', 'w') as collapsed:
+            for stack, count in profile.stacks.most_common():
+                collapsed.write(f'{stack} {count}\n')
+        with open(base + '.sql', 'w') as sql:
+            sql.write(f'-- {request.method} {request.get_full_path()} '
+                      f'{duration * 1000:.1f} ms, '
+                      f'{len(profile.queries)} queries\n')
+            for seconds, query in profile.queries:
+                sql.write(f'-- {seconds * 1000:.2f} ms\n{query};\n')
+
@@ -52,12 +52,51 @@ INSTALLED_APPS = [
 ]
 # THUMBNAIL_DEBUG = False
 
+# Миниатюры постов режет thumbnail_worker, заранее ставятся в очередь
+# эти размеры (geometry, параметры sorl-thumbnail)
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+# что показывать, пока миниатюры нет; None — оригинал картинки
+THUMBNAIL_PLACEHOLDER_URL = None
+# сколько секунд задача очереди принадлежит забравшему её воркеру
+# и сколько раз её пробуют нарезать, прежде чем выбросить
+THUMBNAIL_JOB_LEASE = 10 * 60
+THUMBNAIL_JOB_ATTEMPTS = 3
+
+# Загрузка картинок постов (posts/uploads.py): больше
+# POST_IMAGE_MAX_PIXELS отклоняется, остальное ужимается до
+# POST_IMAGE_MAX_SIDE и перекодируется без метаданных
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_UPLOAD_QUALITY = 85
+
+# Адаптивные варианты картинок постов (<picture> и srcset).
+# Форматы, которые не умеет установленный Pillow, пропускаются;
+# последний в списке идёт в <img> для старых браузеров
+POST_IMAGE_FORMATS = ['avif', 'webp', 'jpeg']
+POST_IMAGE_WIDTHS = [320, 640, 960, 1440]
+POST_IMAGE_ASPECT = (960, 339)
+POST_IMAGE_QUALITY = 80
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
 MIDDLEWARE = [
+    # метрики для /metrics (yatube/metrics.py), первым — чтобы время
+    # ответа включало все остальные middleware
+    'yatube.metrics.MetricsMiddleware',
+    # выборочный профилировщик, только с YATUBE_PROFILE=1
+    'yatube.profiling.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # 304 для страниц без своих валидаторов (ETag по содержимому)
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # чтение лент с реплик (yatube/db/routers.py)
+    'yatube.db.routers.ReplicaMiddleware',
+    # готовые страницы лент для анонимных посетителей (posts/page_cache.py)
+    'posts.page_cache.AnonymousPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,13 +127,89 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль выбирается переменной YATUBE_DB. Соединения постоянные
+# (CONN_MAX_AGE секунд) и проверяются в начале запроса, см. yatube/db.
+DB_CONN_MAX_AGE = int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 600))
+
+SQLITE_PRAGMAS = (
+    # читатели не блокируют писателя и наоборот
+    'PRAGMA journal_mode = WAL;'
+    # в WAL fsync только на контрольных точках: коммит не теряет
+    # целостности, лишь последние транзакции при отключении питания
+    'PRAGMA synchronous = NORMAL;'
+    'PRAGMA mmap_size = 268435456;'
+    # ждать чужую запись до 20 с вместо мгновенного database is locked
+    'PRAGMA busy_timeout = 20000;'
+)
+
+POSTGRES = {
+    'ENGINE': 'yatube.db.postgresql',
+    'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+    'USER': os.environ.get('YATUBE_DB_USER', 'yatube'),
+    'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+    'HOST': os.environ.get('YATUBE_DB_HOST', 'localhost'),
+    'PORT': os.environ.get('YATUBE_DB_PORT', '5432'),
+    'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {'connect_timeout': 5},
+}
+
+DATABASE_PROFILES = {
+    'sqlite': {
+        'ENGINE': 'yatube.db.sqlite',
+        'NAME': os.environ.get(
+            'YATUBE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # нужен psycopg2
+    'postgres': POSTGRES,
+    # пул соединений pgbouncer в режиме transaction: серверные курсоры
+    # не переживают смену соединения между транзакциями
+    'pgbouncer': {
+        **POSTGRES,
+        'PORT': os.environ.get('YATUBE_DB_PORT', '6432'),
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    },
+}
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': DATABASE_PROFILES[os.environ.get('YATUBE_DB', 'sqlite')],
 }
 
+# Реплики для чтения лент (yatube/db/routers.py): через запятую пути
+# к файлам для SQLite или хосты для PostgreSQL. Две копии SQLite
+# локально синхронизирует команда replicate. Тесты запускаются без
+# реплик: их TestCase не разрешают запросы к другим псевдонимам.
+REPLICA_KEY = (
+    'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+)
+for number, location in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(','))):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        REPLICA_KEY: location,
+        # в тестах реплика — та же тестовая база
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['yatube.db.routers.ReplicaRouter']
+REPLICA_READ_VIEWS = (
+    'index', 'group_posts', 'profile', 'post', 'follow_index',
+    'followers', 'following', 'trending',
+)
+REPLICA_READ_APPS = ('posts', 'users')
+# насколько реплика может отставать; столько же после своей записи
+# пользователь читает из основной базы
+REPLICA_LAG_SECONDS = 5
+REPLICA_PIN_COOKIE = 'primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,13 +261,96 @@ LOGIN_REDIRECT_URL = "index"
 
 SITE_ID = 1
 
-CACHES = {
-    'default': {
+# Кэш: shared — общий файл SQLite для всех воркеров на машине
+# (yatube/cache.py), locmem у каждого процесса свой. С locmem кэш
+# страниц, условные GET и популярное выключены: поколения и метки,
+# сдвинутые одним воркером, другие бы не увидели (yatube.cache.is_shared)
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'yatube.cache.SharedFileCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 2 ** 20,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'shared')],
 }
 
 PAGINATOR_PAGE_SIZE = 10
+# сколько секунд CDN или прокси может отдавать анонимную страницу
+# ленты без обращения к сайту (Cache-Control: s-maxage)
+HTML_CACHE_S_MAXAGE = 60
+# кэш страниц для анонимных посетителей: какие адреса (имена из
+# urls.py) кэшируются и сколько живёт запись, если сигнал о её
+# устаревании не пришёл
+PAGE_CACHE_VIEWS = (
+    'index', 'group_posts', 'profile', 'post', 'trending',
+)
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Метрики Prometheus (yatube/metrics.py): без YATUBE_METRICS_PATH
+# каждый процесс считает только себя
+METRICS_PATH = os.environ.get('YATUBE_METRICS_PATH')
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# с каких адресов можно читать /metrics; пустой список — с любых
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+# Профилировщик медленных запросов (yatube/profiling.py)
+PROFILER_ENABLED = os.environ.get('YATUBE_PROFILE') == '1'
+PROFILER_DIR = os.environ.get(
+    'YATUBE_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles')
+)
+PROFILER_SLOW_SECONDS = 0.5
+# дополнительно каждый N-й запрос; 0 — только медленные
+PROFILER_SAMPLE_EVERY = 0
+PROFILER_INTERVAL = 0.005
+# комментариев на странице поста, дальше — по курсору
+COMMENTS_PAGE_SIZE = 50
+
+# Лента подписок: посты авторов с большим числом подписчиков
+# не раскладываются по лентам, а дочитываются при показе. В рассылку
+# автор возвращается, только когда подписчиков стало меньше второго
+# порога (backfill_feeds --resume)
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_FANOUT_RESUME_FOLLOWERS = 8000
+# сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_LIMIT = 500
+# сколько лент пересобирается одним INSERT ... SELECT
+FEED_BATCH_SIZE = 500
+# сколько пользователей держит в памяти процесса кэш подписок
+# (posts/follow_cache.py)
+FOLLOW_CACHE_USERS = 10000
+# «Кого почитать» (posts/suggestions.py): списки считает команда
+# suggest_authors, веб-процессы читают их из кэша — нужен общий
+# кэш (YATUBE_CACHE=shared)
+SUGGESTIONS_SHOWN = 5
+SUGGESTIONS_STORED = 20
+# сколько свежих подписок читателя и подписчиков автора учитывается
+SUGGESTIONS_FANOUT = 100
+SUGGESTIONS_SAMPLE = 50
+# длина списка «с этим автором читают»
+SUGGESTIONS_RELATED = 10
+SUGGESTIONS_TIMEOUT = 2 * 24 * 60 * 60
+# Популярное (posts/trending.py): за столько секунд вклад комментария
+# или поста уменьшается вдвое; топ обновляет команда update_trending,
+# веб-процессы читают его из кэша — нужен общий кэш (YATUBE_CACHE=shared)
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_INTERVAL = 60
+TRENDING_SIZE = 30
+TRENDING_GROUPS = 10
+# остывшие ниже этого строки удаляются
+TRENDING_MIN_SCORE = 0.05
+# сколько живёт топ в кэше, если обновлятель остановился
+TRENDING_TIMEOUT = 10 * 60
 
 '''
 #  подключаем движок filebased.EmailBackend
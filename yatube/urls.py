@@ -21,6 +21,8 @@ from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
+from yatube.metrics import metrics_view
+
 urlpatterns = [
     # flatpages
     path('about/', include('django.contrib.flatpages.urls')),
@@ -38,6 +40,10 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     # раздел администратора
     path('adminka/', admin.site.urls),
+    # метрики для Prometheus
+    path('metrics', metrics_view, name='metrics'),
+    # JSON-версия лент (posts/api.py)
+    path('api/v1/', include('posts.api_urls')),
     # импорт из приложения posts
     path('', include('posts.urls')),
 ]